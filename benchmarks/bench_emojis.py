@@ -0,0 +1,70 @@
+"""Emoji tokenizer throughput against the previous run-matching regex.
+
+    python benchmarks/bench_emojis.py [--messages 1000000]
+"""
+import argparse
+import os
+import random
+import re
+import sys
+import time
+from collections import Counter
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from insta_engine.emojis import count_emojis  # noqa: E402
+
+LEGACY_PATTERN = re.compile(
+    "["
+    "\U0001F300-\U0001F5FF"
+    "\U0001F600-\U0001F64F"
+    "\U0001F680-\U0001F6FF"
+    "\U0001F700-\U0001F77F"
+    "\U0001F780-\U0001F7FF"
+    "\U0001F800-\U0001F8FF"
+    "\U0001FA00-\U0001FA6F"
+    "\U0001FA70-\U0001FAFF"
+    "\u2600-\u26FF"
+    "\u2700-\u27BF"
+    "]+", flags=re.UNICODE
+)
+
+SAMPLES = [
+    "haha \U0001F602\U0001F602\U0001F602", "ok", "see you soon \U0001F44D\U0001F3FD",
+    "\U0001F468\u200D\U0001F469\u200D\U0001F467 family dinner", "\U0001F1EE\U0001F1F3 won!",
+    "love you \u2764\uFE0F\u2764\uFE0F", "what time tomorrow?", "\U0001F923\U0001F970 stop",
+    "no emoji in this one at all, just a longer sentence to scan", "1\uFE0F\u20E3 first",
+]
+
+
+def messages(n, seed=0):
+    rng = random.Random(seed)
+    return [rng.choice(SAMPLES) for _ in range(n)]
+
+
+def throughput(label, fn, texts, repeat=3):
+    # Best of several runs, so the comparison is not decided by noise
+    elapsed = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        counts = fn(texts)
+        elapsed = min(elapsed, time.perf_counter() - start)
+    tokens = sum(counts.values())
+    print(f"{label:<10} {elapsed:7.3f}s  {len(texts) / elapsed / 1e6:6.2f}M msg/s  "
+          f"{tokens / elapsed / 1e6:6.2f}M emojis/s  {tokens:>9} emojis, {len(counts)} distinct")
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--messages', type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    texts = messages(args.messages)
+    legacy = throughput("legacy", lambda t: Counter(LEGACY_PATTERN.findall("\n".join(t))), texts)
+    current = throughput("grapheme", count_emojis, texts)
+    print(f"messages/s vs legacy: {legacy / current:.2f}x")
+
+
+if __name__ == '__main__':
+    main()
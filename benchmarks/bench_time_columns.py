@@ -0,0 +1,58 @@
+"""Derived time columns (date, month, day, hour, weekday) against the previous
+string-based construction.
+
+    python benchmarks/bench_time_columns.py [--messages 1000000]
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from insta_engine.frame import add_time_columns  # noqa: E402
+
+
+def legacy_time_columns(df):
+    df['date'] = df['time'].dt.date
+    df['month'] = df['time'].dt.strftime('%Y-%m')
+    df['month_dt'] = pd.to_datetime(df['month'] + '-01')
+    df['day'] = df['time'].dt.day
+    df['hour'] = df['time'].dt.hour
+    df['weekday'] = df['time'].dt.day_name().str.slice(0, 3)
+    return df
+
+
+def frame(n, seed=0):
+    # Sorted timestamps spread over five years, like a long chat
+    rng = np.random.default_rng(seed)
+    start = pd.Timestamp("2020-01-01").value // 1000
+    offsets = np.sort(rng.integers(0, 5 * 365 * 86_400_000_000, n))
+    return pd.DataFrame({'time': (start + offsets).astype('datetime64[us]')})
+
+
+def timed(label, fn, df):
+    start = time.perf_counter()
+    out = fn(df.copy())
+    elapsed = time.perf_counter() - start
+    memory = out.drop(columns='time').memory_usage(deep=True, index=False).sum() / 2**20
+    print(f"{label:<10} {elapsed:7.3f}s  {len(df) / elapsed / 1e6:6.2f}M rows/s  {memory:7.1f} MB")
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--messages', type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    df = frame(args.messages)
+    legacy = timed("legacy", legacy_time_columns, df)
+    current = timed("integer", add_time_columns, df)
+    print(f"speedup    {legacy / current:7.1f}x")
+
+
+if __name__ == '__main__':
+    main()
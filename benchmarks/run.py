@@ -0,0 +1,111 @@
+"""Per-stage benchmark of the analysis pipeline on synthetic exports.
+
+Generates exports of the requested sizes (see synthetic.py) and times the
+same stages the app runs: decode, parse, timestamp conversion, aggregation
+and figure building. --memory adds peak traced allocation per stage, at
+the cost of slower timings.
+
+    python benchmarks/run.py --messages 10000 100000 1000000
+"""
+import argparse
+import io
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from insta_engine import ChatStats, build_frame, get_messages_dictionary, prepare_frame  # noqa: E402
+from insta_engine.profiling import peak_rss_mb  # noqa: E402
+from synthetic import write_export  # noqa: E402
+
+
+class Upload(io.BytesIO):
+    # Stands in for Streamlit's UploadedFile
+    def __init__(self, name, data):
+        super().__init__(data)
+        self.name = name
+
+
+def build_figures(stats):
+    try:
+        import charts
+    except ImportError:
+        return None
+    figures = [
+        charts.senders_figure(stats), charts.emojis_figure(stats), charts.hours_figure(stats),
+        charts.weekly_figure(stats), charts.monthly_figure(stats), charts.heatmap_figure(stats),
+        charts.calendar_figure(stats),
+    ]
+    # Serialization is part of what the browser waits for
+    return [fig.to_json() for fig in figures]
+
+
+def run_stages(paths, engine, workers, memory):
+    results = []
+
+    def stage(name, fn, rows=None):
+        if memory:
+            tracemalloc.reset_peak()
+        start = time.perf_counter()
+        value = fn()
+        elapsed = time.perf_counter() - start
+        peak = tracemalloc.get_traced_memory()[1] / 2**20 if memory else None
+        results.append((name, elapsed, rows(value) if rows else None, peak))
+        return value
+
+    def decode():
+        # Read and UTF-8 validate every file, as the upload path does
+        uploads = []
+        for path in paths:
+            with open(path, 'rb') as f:
+                data = f.read()
+            data.decode('utf-8')
+            uploads.append(Upload(os.path.basename(path), data))
+        return uploads
+
+    uploads = stage("decode", decode, rows=len)
+    columns = stage("parse", lambda: get_messages_dictionary(uploads, engine=engine, workers=workers), rows=len)
+    df = stage("timestamps", lambda: build_frame(columns), rows=len)
+    stats = stage("aggregate", lambda: ChatStats.from_frame(prepare_frame(df)).dashboard(), rows=lambda s: s.total)
+    stage("figures", lambda: build_figures(stats), rows=lambda figs: len(figs) if figs else 0)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--messages', type=int, nargs='+', default=[10_000, 100_000])
+    parser.add_argument('--workdir', help="Keep generated exports here instead of a temporary directory")
+    parser.add_argument('--engine', default='auto')
+    parser.add_argument('--workers', type=int, default=1)
+    parser.add_argument('--memory', action='store_true', help="Trace peak memory per stage (slower)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        workdir = args.workdir or tmp
+        if args.memory:
+            tracemalloc.start()
+        for n in args.messages:
+            export_dir = os.path.join(workdir, f"export_{n}")
+            if not os.path.isdir(export_dir):
+                write_export(export_dir, n)
+            paths = sorted(os.path.join(export_dir, f) for f in os.listdir(export_dir))
+            size = sum(os.path.getsize(p) for p in paths) / 2**20
+
+            print(f"\n{n:,} messages, {len(paths)} files, {size:.1f} MB")
+            print(f"{'stage':<12}{'seconds':>10}{'rows':>12}{'peak MB':>10}")
+            total = 0
+            for name, elapsed, rows, peak in run_stages(paths, args.engine, args.workers, args.memory):
+                total += elapsed
+                print(f"{name:<12}{elapsed:>10.3f}{rows if rows is not None else '-':>12}"
+                      f"{f'{peak:.1f}' if peak is not None else '-':>10}")
+            print(f"{'total':<12}{total:>10.3f}")
+        maxrss = peak_rss_mb()
+        if maxrss is not None:
+            print(f"\nmax RSS {maxrss:.0f} MB")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,96 @@
+"""Synthetic Instagram HTML exports for benchmarking.
+
+Writes message_1.html ... message_N.html in the export template (newest
+messages first, message_1.html holding the latest) with a realistic mix of
+plain text, emoji-heavy text, reactions, attachments, reels and shared posts.
+
+    python benchmarks/synthetic.py OUT_DIR --messages 100000
+"""
+import argparse
+import html
+import os
+import random
+from datetime import datetime, timedelta
+
+SENDERS = ["Alice", "Bob", "Chandra", "Dmitri", "Eun-ji"]
+
+TEXTS = [
+    "haha", "ok", "see you tomorrow", "what time?", "on my way",
+    "that is hilarious \U0001F602\U0001F602\U0001F602", "love it \u2764\uFE0F", "good night \U0001F634",
+    "\U0001F44D\U0001F3FD", "happy birthday!! \U0001F389\U0001F382\U0001F973",
+    "\U0001F468\u200D\U0001F469\u200D\U0001F467 family dinner on sunday", "\U0001F1EE\U0001F1F3 won the match \U0001F3CF",
+    "can you send me the notes from class, I missed the first half",
+    "lol \U0001F923", "\U0001F525\U0001F525", "miss you \U0001F97A",
+]
+REACTIONS = ["Reacted \u2764\uFE0F to your message", "Reacted \U0001F602 to your message", "Liked a message"]
+
+HEADER = (
+    '<html><head><meta charset="utf-8" /><title>{title}</title></head>'
+    '<body class="_5vb_ _2yq _a7o5"><div class="clearfix _ikh"><div class="_4bl9"><div class="_li">'
+    '<div class="_a705"><div class="_a706" role="main">\n'
+)
+FOOTER = '</div></div></div></div></div></body></html>\n'
+BLOCK = (
+    '<div class="pam _3-95 _2ph- _a6-g uiBoxWhite noborder">'
+    '<h2 class="_3-95 _2pim _a6-h _a6-i">{name}</h2>'
+    '<div class="_3-95 _a6-p"><div><div></div><div>{body}</div><div></div><div></div></div></div>'
+    '<div class="_3-94 _a6-o">{time}</div></div>\n'
+)
+
+
+def format_time(t):
+    # Export layout, e.g. "Jan 05, 2024 3:04 pm"
+    hour = t.hour % 12 or 12
+    return f"{t:%b %d, %Y} {hour}:{t:%M} {'am' if t.hour < 12 else 'pm'}"
+
+
+def message_body(rng, i):
+    roll = rng.random()
+    if roll < 0.06:
+        return html.escape(rng.choice(REACTIONS))
+    if roll < 0.08:
+        return "sent an attachment."
+    if roll < 0.12:
+        url = f"https://www.instagram.com/reel/C{i:09d}/"
+        return f'<a target="_blank" href="{url}">{url}</a>'
+    if roll < 0.14:
+        url = f"https://www.instagram.com/p/B{i:09d}/"
+        return f'<a target="_blank" href="{url}">{url}</a>'
+    return html.escape(rng.choice(TEXTS))
+
+
+def write_export(out_dir, messages, senders=3, per_file=10_000, end=datetime(2025, 6, 30, 23, 0), seed=0):
+    # Streams files to disk, so 10M message exports never sit in memory
+    rng = random.Random(seed)
+    names = SENDERS[:senders]
+    os.makedirs(out_dir, exist_ok=True)
+    paths = []
+    t = end
+    for i in range((messages + per_file - 1) // per_file):
+        path = os.path.join(out_dir, f"message_{i + 1}.html")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(HEADER.format(title=" & ".join(names)))
+            for j in range(min(per_file, messages - i * per_file)):
+                n = i * per_file + j
+                f.write(BLOCK.format(name=rng.choice(names), body=message_body(rng, n), time=format_time(t)))
+                t -= timedelta(seconds=rng.randint(5, 3600))
+            f.write(FOOTER)
+        paths.append(path)
+    return paths
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('out_dir')
+    parser.add_argument('--messages', type=int, default=100_000)
+    parser.add_argument('--senders', type=int, default=3, choices=range(1, len(SENDERS) + 1))
+    parser.add_argument('--per-file', type=int, default=10_000)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    paths = write_export(args.out_dir, args.messages, args.senders, args.per_file, seed=args.seed)
+    print(f"Wrote {args.messages} messages to {len(paths)} files in {args.out_dir}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,135 @@
+import pandas as pd
+import plotly.express as px
+import plotly.graph_objects as go
+
+template = "plotly_dark"
+
+HEATMAP_COLORSCALE = [[0, '#161b22'], [0.2, '#0e4429'], [0.4, '#006d32'], [0.6, '#26a641'], [0.8, '#39d353'], [1, '#39d353']]
+
+
+def hour_label_12h(h):
+    suffix = "AM" if h < 12 else "PM"
+    hour12 = h % 12
+    if hour12 == 0:
+        hour12 = 12
+    return f"{hour12} {suffix}"
+
+
+def senders_figure(stats):
+    top_n = stats.senders.head(10)
+    fig_senders = px.bar(top_n[::-1], x='count', y='name', orientation='h', text='count', template=template)
+    fig_senders.update_traces(marker_color='#60a5fa', hovertemplate='%{y}: %{x} msgs')
+    return fig_senders
+
+
+def emojis_figure(stats):
+    top_e = stats.emojis.head(15)
+    fig_emojis = px.bar(top_e[::-1], x='count', y='emoji', orientation='h', text='count', template=template)
+    fig_emojis.update_traces(marker_color='#fbbf24', hovertemplate='%{y}: %{x}')
+    return fig_emojis
+
+
+def hours_figure(stats):
+    hourly = stats.hours.copy()
+    hourly['hour_label'] = hourly['hour'].apply(hour_label_12h)
+
+    fig_hour = px.bar(hourly, x='hour_label', y='count', template=template)
+    fig_hour.update_traces(marker_color='#34d399', hovertemplate='%{x}: %{y} msgs')
+    fig_hour.update_xaxes(categoryorder='array', categoryarray=[hour_label_12h(h) for h in range(24)])
+    return fig_hour
+
+
+def weekly_figure(stats):
+    fig_weekly = px.bar(stats.weekly, x='week', y='count', template=template)
+    fig_weekly.update_traces(marker_color='#60a5fa', hovertemplate='%{y} messages')
+    fig_weekly.update_layout(xaxis_title="Week", yaxis_title="Messages")
+    return fig_weekly
+
+
+def monthly_figure(stats):
+    fig_month = px.bar(stats.monthly, x='month_dt', y='count', template=template)
+    fig_month.update_traces(marker_color='#a78bfa')
+    return fig_month
+
+
+def heatmap_figure(stats):
+    heatmap_pivot = stats.heatmap
+
+    x_labels = [d.strftime('%b') for d in heatmap_pivot.columns]
+    y_labels = ['Week 1', 'Week 2', 'Week 3', 'Week 4']
+
+    max_val = heatmap_pivot.values.max()
+    z_max = max(max_val, 10)
+
+    fig_heat = go.Figure(data=go.Heatmap(
+        z=heatmap_pivot.values,
+        x=x_labels,
+        y=y_labels,
+        colorscale=HEATMAP_COLORSCALE,
+        showscale=False,
+        zmin=0,
+        zmax=z_max,
+        hovertemplate='Month: %{x}<br>%{y}: %{z} messages<extra></extra>',
+        xgap=3,
+        ygap=3
+    ))
+    fig_heat.update_layout(
+        template=template,
+        height=220,
+        xaxis=dict(side='top', showgrid=False, tickangle=0),
+        yaxis=dict(showgrid=False, autorange='reversed', tickfont=dict(size=10)),
+        margin=dict(l=50, r=20, t=50, b=20)
+    )
+    return fig_heat
+
+
+def calendar_figure(stats):
+    calendar = stats.calendar
+
+    # Month label on the first week of each month, like a contribution graph
+    x_labels = list(range(len(calendar.columns)))
+    tick_labels = [d.strftime('%b') if i == 0 or d.month != calendar.columns[i - 1].month else ''
+                   for i, d in enumerate(calendar.columns)]
+    dates = [[(week + pd.Timedelta(days=row)).strftime('%b %d, %Y') for week in calendar.columns]
+             for row in range(len(calendar.index))]
+
+    z_max = max(calendar.max().max(), 10)
+
+    fig_calendar = go.Figure(data=go.Heatmap(
+        z=calendar.values,
+        x=x_labels,
+        y=list(calendar.index),
+        customdata=dates,
+        colorscale=HEATMAP_COLORSCALE,
+        showscale=False,
+        zmin=0,
+        zmax=z_max,
+        hoverongaps=False,
+        hovertemplate='%{customdata}: %{z} messages<extra></extra>',
+        xgap=3,
+        ygap=3
+    ))
+    fig_calendar.update_layout(
+        template=template,
+        height=220,
+        xaxis=dict(side='top', showgrid=False, tickmode='array', tickvals=x_labels, ticktext=tick_labels, tickangle=0),
+        yaxis=dict(showgrid=False, autorange='reversed', tickfont=dict(size=10)),
+        margin=dict(l=50, r=20, t=50, b=20)
+    )
+    return fig_calendar
+
+
+def busiest_chats_figure(busiest):
+    top_n = busiest.head(15)
+    fig_chats = px.bar(
+        top_n[::-1], x='messages', y='thread', orientation='h', text='messages', custom_data=['title'], template=template
+    )
+    fig_chats.update_traces(marker_color='#c084fc', hovertemplate='%{customdata[0]}: %{x} msgs')
+    return fig_chats
+
+
+def top_contacts_figure(contacts):
+    top_n = contacts.head(15)
+    fig_contacts = px.bar(top_n[::-1], x='messages', y='name', orientation='h', text='messages', template=template)
+    fig_contacts.update_traces(marker_color='#60a5fa', hovertemplate='%{y}: %{x} msgs')
+    return fig_contacts
@@ -1,11 +1,17 @@
 import streamlit as st
-from bs4 import BeautifulSoup
-import re
-from collections import Counter
-from datetime import datetime
+import os
+from contextlib import nullcontext
+
 import pandas as pd
-import plotly.express as px
-import plotly.graph_objects as go
+
+from charts import (
+    senders_figure, emojis_figure, hours_figure, weekly_figure, monthly_figure, heatmap_figure, calendar_figure,
+    busiest_chats_figure, top_contacts_figure
+)
+from insta_engine import (
+    ParseCache, DiskCache, file_key, load_frame, prepare_frame, export_threads, is_zip, ChatStats, IncrementalAnalysis,
+    collect, stage, MessageFilter, index_thread, index_inbox, index_table, analyse_inbox, busiest_chats, top_contacts, guess_owner
+)
 
 st.set_page_config(
     page_title="Instagram Chat Analyser",
@@ -60,98 +66,6 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
-def get_messages_dictionary(uploaded_files, include_reels=False):
-    if not uploaded_files:
-        return []
-
-    messages = []
-    
-    # List of known reaction patterns to exclude
-    REACTION_PATTERNS = [
-        "Reacted", "Liked a message", "Loved a message", 
-        "Emphasized a message", "Laughed at a message", 
-        "Questioned a message", "Disliked a message"
-    ]
-    
-    for uploaded_file in uploaded_files:
-        try:
-            string_data = uploaded_file.getvalue().decode("utf-8")
-            soup = BeautifulSoup(string_data, 'html.parser')
-            
-            message_blocks = soup.select('div.pam.uiBoxWhite.noborder')
-            
-            for msg in message_blocks:
-                name_tag = msg.find('h2')
-                message_tag = msg.find('div', class_='_3-95 _a6-p')
-                time_tag = msg.find('div', class_='_3-94 _a6-o')
-
-                if not (name_tag and message_tag and time_tag):
-                    continue
-                
-                # Extract text content
-                text_content = message_tag.get_text(" ", strip=True)
-                
-                # STRICT REACTION FILTERING
-                # Check if the message is just a reaction notification
-                is_reaction = any(pattern in text_content for pattern in REACTION_PATTERNS)
-                if is_reaction:
-                    continue
-
-                # REELS / ATTACHMENTS HANDLING
-                has_link = message_tag.find('a') is not None
-                is_attachment_text = "sent an attachment" in text_content or "shared a reel" in text_content
-                
-                if (has_link or is_attachment_text):
-                    if not include_reels:
-                        continue
-                    # If including reels, try to get the link text or formatting
-                    if has_link:
-                         link_tag = message_tag.find('a')
-                         # Use the link content or generic text
-                         msg_text = f"Attachment: {link_tag.get_text()}" 
-                    else:
-                         msg_text = text_content
-                else:
-                    msg_text = text_content
-
-                messages.append({
-                    'name': name_tag.get_text(strip=True),
-                    'message': msg_text,
-                    'time': time_tag.get_text(strip=True)
-                })
-        except Exception as e:
-            st.warning(f"Could not parse file {uploaded_file.name}: {e}")
-            continue
-
-    return messages
-
-EMOJI_PATTERN = re.compile(
-    "["
-    "\U0001F300-\U0001F5FF"
-    "\U0001F600-\U0001F64F"
-    "\U0001F680-\U0001F6FF"
-    "\U0001F700-\U0001F77F"
-    "\U0001F780-\U0001F7FF"
-    "\U0001F800-\U0001F8FF"
-    "\U0001FA00-\U0001FA6F"
-    "\U0001FA70-\U0001FAFF"
-    "\u2600-\u26FF"
-    "\u2700-\u27BF"
-    "]+", flags=re.UNICODE
-)
-
-def extract_emojis(text):
-    if not isinstance(text, str):
-        return []
-    return EMOJI_PATTERN.findall(text)
-
-def hour_label_12h(h):
-    suffix = "AM" if h < 12 else "PM"
-    hour12 = h % 12
-    if hour12 == 0:
-        hour12 = 12
-    return f"{hour12} {suffix}"
-
 st.title("Instagram Chat Analyser 🚀")
 st.write("Visualize your Instagram chat history in seconds!")
 
@@ -163,181 +77,273 @@ with st.expander("📥 How to get your Instagram chat files? (Click to Expand)",
     4. **Format**: Choose **HTML** (Crucial!) and Download to device.
     5. Wait for the email.
     6. After receiving the email, go back to settings export page and download your information.
-    7. Download the zip file, extract it, and find `your_instagram_activity/messages/inbox/[chat_you_want_to_analyze]`. Inside there will be HTML files that you need to upload here.
+    7. Download the zip file and upload it here directly, or extract it and find `your_instagram_activity/messages/inbox/[chat_you_want_to_analyze]`. Inside there will be HTML files that you need to upload here.
     """)
 
 uploaded_files = st.file_uploader(
-    "📂 Drop your `message_1.html` files here to analyze:", 
-    type=['html'], 
+    "📂 Drop your `message_1.html` files or the export `.zip` here to analyze:", 
+    type=['html', 'zip'], 
     accept_multiple_files=True
 )
 
+# Export archives are read member by member, never extracted
+inbox_mode = False
+if uploaded_files and any(is_zip(f) for f in uploaded_files):
+    threads = {}
+    for f in uploaded_files:
+        if is_zip(f):
+            try:
+                threads.update(export_threads(f))
+            except Exception as e:
+                st.warning(f"Could not read archive {f.name}: {e}")
+    uploaded_files = [f for f in uploaded_files if not is_zip(f)]
+    if threads:
+        # Whole-inbox mode ranks every conversation instead of charting one
+        inbox_mode = len(threads) > 1 and st.toggle("🗂️ Analyze the whole inbox", value=False)
+        if not inbox_mode:
+            thread = st.selectbox("💬 Chat to analyze:", sorted(threads))
+            uploaded_files += threads[thread]
+    elif not uploaded_files:
+        st.warning("No chats found in the archive.")
+
 include_reels = st.toggle("Include Reels, Posts & Attachments 📸", value=False)
 
-if uploaded_files:
-    with st.spinner("Parsing messages..."):
-        messages = get_messages_dictionary(uploaded_files, include_reels)
-        
-    if messages:
-        st.success(f"Successfully loaded {len(messages)} messages!")
-        
-        rows = []
-        for m in messages:
-            name = m.get('name') or 'Unknown'
-            msg = m.get('message') or ''
-            time_str = m.get('time') or ''
-            dt = None
-            for fmt in ("%b %d, %Y %I:%M %p", "%Y-%m-%d %H:%M:%S", "%d %b %Y %H:%M", "%Y-%m-%d"):
-                try:
-                    dt = datetime.strptime(time_str, fmt)
-                    break
-                except Exception:
-                    continue
-            if dt is None:
-                dt = pd.to_datetime(time_str, errors='coerce')
-                
-            if pd.notnull(dt):
-                rows.append({
-                    'name': name,
-                    'message': msg,
-                    'time': pd.to_datetime(dt),
-                    'length': len(msg)
-                })
-
-        if not rows:
-            st.error("No valid messages found.")
-        else:
-            df = pd.DataFrame(rows).sort_values('time')
-
-            df['date'] = df['time'].dt.date
-            df['month'] = df['time'].dt.strftime('%Y-%m')
-            df['month_dt'] = pd.to_datetime(df['month'] + '-01')
-            df['day'] = df['time'].dt.day
-            df['hour'] = df['time'].dt.hour
-            df['weekday'] = df['time'].dt.day_name().str.slice(0,3)
-
-            df['emojis'] = df['message'].apply(extract_emojis)
-            emoji_counts = Counter([e for sub in df['emojis'] for e in sub])
-            top_emojis = pd.DataFrame(emoji_counts.most_common(), columns=['emoji', 'count'])
-
-            sender_counts = df['name'].value_counts().reset_index()
-            sender_counts.columns = ['name', 'count']
-
-            template = "plotly_dark"
-
-            col1, col2, col3 = st.columns(3)
-
-            with col1:
-                st.subheader("Top Senders")
-                top_n = sender_counts.head(10)
-                fig_senders = px.bar(top_n[::-1], x='count', y='name', orientation='h', text='count', template=template)
-                fig_senders.update_traces(marker_color='#60a5fa', hovertemplate='%{y}: %{x} msgs')
-                st.plotly_chart(fig_senders, use_container_width=True)
-
-            with col2:
-                st.subheader("Top Emojis")
-                if not top_emojis.empty:
-                    top_e = top_emojis.head(15)
-                    fig_emojis = px.bar(top_e[::-1], x='count', y='emoji', orientation='h', text='count', template=template)
-                    fig_emojis.update_traces(marker_color='#fbbf24', hovertemplate='%{y}: %{x}')
-                    st.plotly_chart(fig_emojis, use_container_width=True)
-                else:
-                    st.write("No emojis found.")
-
-            with col3:
-                st.subheader("Activity by Hour")
-                hour_counts = df['hour'].value_counts().reindex(range(24), fill_value=0).sort_index().reset_index()
-                hour_counts.columns = ['hour', 'count']
-                hour_counts['hour_label'] = hour_counts['hour'].apply(hour_label_12h)
-                
-                fig_hour = px.bar(hour_counts, x='hour_label', y='count', template=template)
-                fig_hour.update_traces(marker_color='#34d399', hovertemplate='%{x}: %{y} msgs')
-                fig_hour.update_xaxes(categoryorder='array', categoryarray=[hour_label_12h(h) for h in range(24)])
-                st.plotly_chart(fig_hour, use_container_width=True)
-
-            col4, col5 = st.columns(2)
-
-            with col4:
-                st.subheader("Weekly Activity")
-                df_idx = df.set_index('time')
-                weekly_total = df_idx.resample('W-MON').size().reset_index(name='count')
-                weekly_total.columns = ['week', 'count']
-                
-                if not weekly_total.empty:
-                    fig_weekly = px.bar(weekly_total, x='week', y='count', template=template)
-                    fig_weekly.update_traces(marker_color='#60a5fa', hovertemplate='%{y} messages')
-                    fig_weekly.update_layout(xaxis_title="Week", yaxis_title="Messages")
-                    st.plotly_chart(fig_weekly, use_container_width=True)
-                else:
-                    st.write("Not enough data for trend.")
-
-            with col5:
-                st.subheader("Monthly Growth")
-                monthly_counts = df.groupby('month_dt').size().reset_index(name='count').sort_values('month_dt')
-                fig_month = px.bar(monthly_counts, x='month_dt', y='count', template=template)
-                fig_month.update_traces(marker_color='#a78bfa')
-                st.plotly_chart(fig_month, use_container_width=True)
-            
-            st.subheader("Activity Heatmap (Weekly)")
-            
-          
-            df_heat = df.copy()
-            
-     
-            weekly_data = df_heat.set_index('time').resample('W-MON').size().reset_index(name='count')
-            
-           
-            weekly_data['month_date'] = weekly_data['time'].dt.to_period('M').apply(lambda r: r.start_time)
-            
-  
-            weekly_data['week_rank'] = weekly_data.groupby('month_date').cumcount() + 1
-            
-        
-            weekly_data.loc[weekly_data['week_rank'] > 4, 'week_rank'] = 4
-            
-    
-            weekly_data = weekly_data.groupby(['month_date', 'week_rank'])['count'].sum().reset_index()
-            
-            
-            last_year = weekly_data['month_date'].max() - pd.DateOffset(months=11)
-            weekly_data = weekly_data[weekly_data['month_date'] >= last_year]
-            
-           
-            heatmap_pivot = weekly_data.pivot(index='week_rank', columns='month_date', values='count').fillna(0)
-            
-           
-            heatmap_pivot = heatmap_pivot.reindex(range(1, 5), fill_value=0)
-            
-           
-            x_labels = [d.strftime('%b') for d in heatmap_pivot.columns]
-            y_labels = ['Week 1', 'Week 2', 'Week 3', 'Week 4']
-            
-         
-            max_val = heatmap_pivot.values.max()
-            z_max = max(max_val, 10)
-            
-            fig_heat = go.Figure(data=go.Heatmap(
-                z=heatmap_pivot.values,
-                x=x_labels,
-                y=y_labels,
-                colorscale=[[0, '#161b22'], [0.2, '#0e4429'], [0.4, '#006d32'], [0.6, '#26a641'], [0.8, '#39d353'], [1, '#39d353']],
-                showscale=False,
-                zmin=0,
-                zmax=z_max,
-                hovertemplate='Month: %{x}<br>%{y}: %{z} messages<extra></extra>',
-                xgap=3,
-                ygap=3
-            ))
-            fig_heat.update_layout(
-                template=template,
-                height=220, 
-                xaxis=dict(side='top', showgrid=False, tickangle=0),
-                yaxis=dict(showgrid=False, autorange='reversed', tickfont=dict(size=10)),
-                margin=dict(l=50, r=20, t=50, b=20)
+# Opt-in multi-process parsing for chats split into many message_N.html files
+parse_workers = st.sidebar.number_input(
+    "Parser processes", min_value=1, max_value=os.cpu_count() or 1, value=1,
+    help="Parse uploaded files in parallel. 1 keeps parsing in the app process."
+)
+
+# Optional on-disk cache of parsed chats, shared across sessions
+cache_dir = st.sidebar.text_input(
+    "Parsed chat cache directory", value=os.environ.get("INSTA_CACHE_DIR", ""),
+    help="Store parsed chats as Parquet here so repeat analyses skip parsing. Leave empty to disable."
+)
+disk_cache = None
+if cache_dir:
+    try:
+        disk_cache = DiskCache(cache_dir)
+    except Exception as e:
+        st.sidebar.warning(f"Cache disabled: {e}")
+
+# Parsed files are cached per session, so reruns only parse new uploads
+if 'parse_cache' not in st.session_state:
+    st.session_state.parse_cache = ParseCache()
+
+
+def inbox_index():
+    # The index comes from a byte scan of every thread; it is rebuilt only
+    # when a different archive is uploaded. Re-exports keep their thread
+    # names, so the key is every member's own key.
+    archive_key = tuple(sorted((thread, file_key(f)) for thread, files in threads.items() for f in files))
+    if st.session_state.get('inbox_key') != archive_key:
+        with st.spinner("Indexing conversations..."):
+            st.session_state.inbox_index = index_inbox(
+                threads, on_error=lambda t, e: st.warning(f"Could not index chat {t}: {e}")
             )
-            st.plotly_chart(fig_heat, use_container_width=True)
+        st.session_state.inbox_key = archive_key
+        # Results of the previous archive's members are never reused
+        st.session_state.pop('inbox_results', None)
+        st.session_state.pop('inbox_results_key', None)
+    return st.session_state.inbox_index
 
+
+# Date and sender filters are applied while parsing, so narrow selections
+# skip whole files and never decode messages outside them
+message_filter = None
+if (uploaded_files or inbox_mode) and st.sidebar.toggle("Filter by date or sender", value=False):
+    if inbox_mode:
+        chats = inbox_index()
     else:
-        st.warning("No messages found.")
+        # Byte scan of the chat's files, redone only when they change
+        upload_key = tuple(file_key(f) for f in uploaded_files)
+        if st.session_state.get('upload_index_key') != upload_key:
+            st.session_state.upload_index = index_thread("upload", uploaded_files)
+            st.session_state.upload_index_key = upload_key
+        chats = [st.session_state.upload_index]
+    firsts = [info.first for info in chats if info.first is not None]
+    lasts = [info.last for info in chats if info.last is not None]
+    since = until = None
+    if firsts and lasts:
+        first_day, last_day = min(firsts).date(), max(lasts).date()
+        picked = st.sidebar.date_input(
+            "Date range", value=(first_day, last_day), min_value=first_day, max_value=last_day
+        )
+        # The whole range filters nothing, so it stays off and cache keys
+        # match the unfiltered run
+        if len(picked) == 2 and tuple(picked) != (first_day, last_day):
+            since, until = picked
+    senders = st.sidebar.multiselect(
+        "Senders", sorted({name for info in chats for name in info.participants}),
+        help="Leave empty to include everyone."
+    )
+    message_filter = MessageFilter.create(since, until, senders)
+
+# Incremental mode keeps per-file aggregates and only parses newly added files
+incremental = st.sidebar.toggle(
+    "Incremental analysis", value=False,
+    help="Keep the statistics of files already analysed and only parse new message_N.html files."
+)
+if incremental:
+    analysis = st.session_state.get('incremental_analysis')
+    if analysis is None or not analysis.matches(include_reels, message_filter):
+        analysis = st.session_state.incremental_analysis = IncrementalAnalysis(include_reels, message_filter)
+
+# Per-stage timings of this run, shown below the charts
+show_performance = st.sidebar.toggle(
+    "Show performance", value=False,
+    help="Time each pipeline stage (parsing, timestamps, aggregation, figures) and show the results."
+)
+
+if inbox_mode:
+    index = inbox_index()
+
+    st.subheader(f"Inbox: {len(index)} conversations")
+    st.dataframe(index_table(index), hide_index=True, use_container_width=True)
+
+    selected = st.multiselect(
+        "Conversations to analyze:", [info.thread for info in index], default=[info.thread for info in index],
+        help="Defaults to every conversation in the export."
+    )
+    if selected:
+        chosen = [info for info in index if info.thread in set(selected)]
+        # Results are kept for the session, so reruns from unrelated widgets
+        # don't parse the inbox again
+        results_key = (
+            tuple(file_key(f) for info in chosen for f in info.files), include_reels,
+            message_filter.key if message_filter is not None else None
+        )
+        if st.session_state.get('inbox_results_key') != results_key:
+            with st.spinner(f"Analyzing {len(chosen)} conversations..."):
+                st.session_state.inbox_results = analyse_inbox(
+                    chosen, include_reels, workers=parse_workers,
+                    on_error=lambda f, e: st.warning(f"Could not parse file {f.name}: {e}"),
+                    message_filter=message_filter
+                )
+            st.session_state.inbox_results_key = results_key
+        results = st.session_state.inbox_results
+        busiest = busiest_chats(results, index)
+        # With a sender filter every chat has the chosen senders in common
+        owner = guess_owner(results) if message_filter is None or message_filter.senders is None else None
+        contacts = top_contacts(results, exclude=owner)
+        st.success(f"Successfully loaded {int(busiest['messages'].sum())} messages from {len(busiest)} conversations!")
+
+        col1, col2 = st.columns(2)
+
+        with col1:
+            st.subheader("Busiest Chats")
+            st.plotly_chart(busiest_chats_figure(busiest), use_container_width=True)
+
+        with col2:
+            st.subheader("Top Contacts")
+            st.plotly_chart(top_contacts_figure(contacts), use_container_width=True)
+
+        st.dataframe(busiest, hide_index=True, use_container_width=True)
+elif uploaded_files:
+    profiling = collect() if show_performance else nullcontext()
+    with profiling as profiler:
+        on_error = lambda f, e: st.warning(f"Could not parse file {f.name}: {e}")
+        with st.spinner("Parsing messages..."):
+            if incremental:
+                totals = analysis.update(uploaded_files, on_error=on_error, workers=parse_workers)
+            else:
+                parsed = load_frame(
+                    uploaded_files,
+                    disk_cache=disk_cache,
+                    on_error=on_error,
+                    cache=st.session_state.parse_cache,
+                    workers=parse_workers,
+                    message_filter=message_filter
+                )
+                totals = ChatStats.from_frame(prepare_frame(parsed, include_reels)) if not parsed.empty else None
+        
+        if totals is not None:
+            if totals.total == 0:
+                st.error("No valid messages found.")
+            else:
+                st.success(f"Successfully loaded {totals.total} messages!")
+
+                stats = totals.dashboard()
+
+                # Figures are built the first time their tab is opened and kept
+                # until the statistics change; only the open tab is sent to the browser
+                fingerprint = stats.fingerprint()
+                if st.session_state.get('figure_key') != fingerprint:
+                    st.session_state.figure_key = fingerprint
+                    st.session_state.figures = {}
+                figures = st.session_state.figures
+
+                def show_chart(build):
+                    if build.__name__ not in figures:
+                        figures[build.__name__] = build(stats)
+                    st.plotly_chart(figures[build.__name__], use_container_width=True)
+
+                people_tab, hours_tab, trends_tab, heatmap_tab = st.tabs(
+                    ["👥 Senders & Emojis", "🕐 Activity by Hour", "📈 Trends", "🔥 Heatmap"],
+                    key="dashboard_tab", on_change="rerun"
+                )
+
+                with stage("figures"):
+                    if people_tab.open:
+                        with people_tab:
+                            col1, col2 = st.columns(2)
+
+                            with col1:
+                                st.subheader("Top Senders")
+                                show_chart(senders_figure)
+
+                            with col2:
+                                st.subheader("Top Emojis")
+                                if not stats.emojis.empty:
+                                    show_chart(emojis_figure)
+                                else:
+                                    st.write("No emojis found.")
+
+                    if hours_tab.open:
+                        with hours_tab:
+                            st.subheader("Activity by Hour")
+                            show_chart(hours_figure)
+
+                    if trends_tab.open:
+                        with trends_tab:
+                            col4, col5 = st.columns(2)
+
+                            with col4:
+                                st.subheader("Weekly Activity")
+                                if not stats.weekly.empty:
+                                    show_chart(weekly_figure)
+                                else:
+                                    st.write("Not enough data for trend.")
+
+                            with col5:
+                                st.subheader("Monthly Growth")
+                                show_chart(monthly_figure)
+
+                    if heatmap_tab.open:
+                        with heatmap_tab:
+                            view = st.radio(
+                                "Heatmap view", ["Weekly", "Calendar"], horizontal=True, key="heatmap_view",
+                                label_visibility="collapsed"
+                            )
+                            if view == "Calendar":
+                                st.subheader("Activity Heatmap (Last 53 Weeks)")
+                                show_chart(calendar_figure)
+                            else:
+                                st.subheader("Activity Heatmap (Weekly)")
+                                show_chart(heatmap_figure)
+
+        else:
+            st.warning("No messages found.")
+
+    if profiler is not None:
+        with st.expander("⏱️ Performance", expanded=False):
+            report = profiler.report()
+            st.dataframe(pd.DataFrame(report['stages']), hide_index=True, use_container_width=True)
+            if report['counters']:
+                st.json(report['counters'])
+            if 'frame_memory' in profiler.tables:
+                memory = profiler.tables['frame_memory']
+                st.caption(f"Frame memory: {memory['bytes'].sum() / 2**20:.1f} MB")
+                st.dataframe(memory, hide_index=True, use_container_width=True)
 else:
     st.info("👆 Upload files to start.")
@@ -0,0 +1,19 @@
+from .parsing import get_messages_dictionary, parse_html, PARSER_ENGINES, PARSER_VERSION
+from .cache import ParseCache, DiskCache, content_hash, file_key
+from .columns import MessageColumns, KINDS
+from .classify import MessageClassifier, SYSTEM_MESSAGES, add_language, classify_messages
+from .export import ZipMember, LocalFile, export_threads, collect_chats, is_zip
+from .frame import (
+    visible_mask, build_frame, parse_timestamps, load_frame, add_time_columns, prepare_frame, memory_report,
+    MEDIA_KINDS, WEEKDAYS, FRAME_SCHEMA,
+)
+from .emojis import extract_emojis, count_emojis, emoji_table, EMOJI_PATTERN
+from .stats import ChatStats, DashboardStats, compute_stats, weekly_heatmap, calendar_heatmap, chat_summary, STATS_VERSION
+from .incremental import IncrementalAnalysis
+from .mapreduce import file_stats, map_stats, aggregate_files
+from .inbox import (
+    ThreadInfo, index_thread, index_inbox, index_export, index_table, analyse_inbox, busiest_chats, top_contacts,
+    guess_owner
+)
+from .filters import MessageFilter
+from .profiling import Profiler, collect, stage, count, report_table
@@ -0,0 +1,127 @@
+import hashlib
+import os
+import tempfile
+from collections import OrderedDict
+
+try:
+    import pyarrow.parquet as pq
+except ImportError:  # the on-disk cache is optional
+    pq = None
+
+
+def content_hash(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+def file_key(uploaded_file):
+    # Zip members and local files know a cheaper key than hashing their bytes
+    if hasattr(uploaded_file, 'cache_key'):
+        return uploaded_file.cache_key
+    return content_hash(uploaded_file.getvalue())
+
+
+class ParseCache:
+    # In-memory LRU of parsed message records, keyed by file content hash.
+    # Bounded by the total number of cached records rather than entry count,
+    # since one message_N.html can hold anything from a few to 10k+ messages.
+
+    def __init__(self, max_records=2_000_000):
+        self.max_records = max_records
+        self._entries = OrderedDict()
+        self._size = 0
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    def get(self, key):
+        records = self._entries.get(key)
+        if records is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return records
+
+    def put(self, key, records):
+        if key in self._entries:
+            self._size -= len(self._entries.pop(key))
+        # A single file larger than the whole budget is simply not cached
+        if len(records) > self.max_records:
+            return
+        self._entries[key] = records
+        self._size += len(records)
+        while self._size > self.max_records:
+            _, evicted = self._entries.popitem(last=False)
+            self._size -= len(evicted)
+
+    def clear(self):
+        self._entries.clear()
+        self._size = 0
+
+
+class DiskCache:
+    # Parsed chat frames (after timestamp parsing, before aggregation) stored
+    # as Parquet files, keyed by the chat's file hashes and the parser version.
+    # Least recently read files are deleted once the directory exceeds max_bytes.
+
+    def __init__(self, directory, max_bytes=1 << 30):
+        if pq is None:
+            raise RuntimeError("The on-disk cache needs pyarrow installed")
+        self.directory = directory
+        self.max_bytes = max_bytes
+        os.makedirs(directory, exist_ok=True)
+
+    def key_for(self, uploaded_files, version):
+        digest = hashlib.sha256(f"v{version}".encode())
+        for key in sorted(file_key(f) for f in uploaded_files):
+            digest.update(key.encode())
+        return digest.hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.directory, f"{key}.parquet")
+
+    def get(self, key):
+        path = self._path(key)
+        try:
+            df = pq.read_table(path, memory_map=True).to_pandas()
+        except FileNotFoundError:
+            return None
+        except Exception:
+            # Truncated or corrupt file (e.g. an interrupted write by another
+            # version): treat it as a miss and drop it so it is rewritten
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            return None
+        os.utime(path)
+        return df
+
+    def put(self, key, df):
+        fd, tmp = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        os.close(fd)
+        try:
+            df.to_parquet(tmp, index=False)
+            os.replace(tmp, self._path(key))
+        finally:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+        self.evict()
+
+    def evict(self):
+        entries = []
+        for name in os.listdir(self.directory):
+            if name.endswith(".parquet"):
+                stat = os.stat(os.path.join(self.directory, name))
+                entries.append((stat.st_mtime, stat.st_size, name))
+        total = sum(size for _, size, _ in entries)
+        for _, size, name in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            os.remove(os.path.join(self.directory, name))
+            total -= size
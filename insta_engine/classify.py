@@ -0,0 +1,100 @@
+import hashlib
+import json
+import re
+
+import numpy as np
+
+from .columns import KIND_CODES
+
+# Phrases Instagram writes in place of a message body, per export language.
+# Add a language with add_language(); every registered language is matched
+# in the same pass, so mixed-language inboxes classify correctly too.
+SYSTEM_MESSAGES = {
+    'en': {
+        'reaction': [
+            "Reacted", "Liked a message", "Loved a message",
+            "Emphasized a message", "Laughed at a message",
+            "Questioned a message", "Disliked a message"
+        ],
+        'reel': ["shared a reel"],
+        'attachment': ["sent an attachment"],
+    },
+}
+
+# When a message contains phrases of several kinds, the first listed wins
+PHRASE_KINDS = ('reaction', 'reel', 'attachment')
+REEL_LINK = "/reel/"
+
+
+class MessageClassifier:
+    # Labels a whole column of message texts in one regex scan. The texts are
+    # joined into a single buffer and every phrase occurrence is found by one
+    # compiled alternation; match offsets map back to rows with searchsorted.
+
+    def __init__(self, languages):
+        self.phrase_rank = {}
+        for phrases in languages.values():
+            for rank, kind in enumerate(PHRASE_KINDS):
+                for phrase in phrases.get(kind, ()):
+                    self.phrase_rank[phrase] = min(rank, self.phrase_rank.get(phrase, rank))
+        # Matches do not overlap and longer phrases are tried first, so a
+        # phrase that contains another takes the better of the two ranks
+        self.phrase_rank = {
+            phrase: min(rank for other, rank in self.phrase_rank.items() if other in phrase)
+            for phrase in self.phrase_rank
+        }
+        alternation = "|".join(re.escape(p) for p in sorted(self.phrase_rank, key=len, reverse=True))
+        self.pattern = re.compile(alternation)
+
+    def phrase_ranks(self, texts):
+        # Per row, the rank of the highest ranked phrase it contains
+        # (len(PHRASE_KINDS) where there is none)
+        ranks = np.full(len(texts), len(PHRASE_KINDS), dtype=np.int8)
+        if not texts or not self.phrase_rank:
+            return ranks
+        # NUL never occurs in a phrase, so matches cannot span two rows
+        widths = np.fromiter(map(len, texts), dtype=np.int64, count=len(texts)) + 1
+        starts = np.cumsum(widths) - widths
+        matches = [(m.start(), self.phrase_rank[m.group()]) for m in self.pattern.finditer("\0".join(texts))]
+        if matches:
+            offsets, match_ranks = np.array(matches).T
+            np.minimum.at(ranks, np.searchsorted(starts, offsets, side='right') - 1, match_ranks.astype(np.int8))
+        return ranks
+
+    def classify(self, texts, links):
+        # Kind codes for message texts and their link texts (None where the
+        # message has no link). Reactions win over everything; messages with
+        # a link are reels or links; the rest are reels, attachments or text.
+        ranks = self.phrase_ranks(texts)
+        reaction, reel, attachment = (ranks == PHRASE_KINDS.index(kind) for kind in PHRASE_KINDS)
+        has_link = np.zeros(len(texts), dtype=bool)
+        reel_link = np.zeros(len(texts), dtype=bool)
+        linked = [i for i, link in enumerate(links) if link is not None]
+        has_link[linked] = True
+        reel_link[[i for i in linked if REEL_LINK in links[i]]] = True
+
+        kinds = np.full(len(texts), KIND_CODES['text'], dtype=np.int8)
+        kinds[attachment & ~has_link] = KIND_CODES['attachment']
+        kinds[has_link] = KIND_CODES['link']
+        kinds[reel | (has_link & reel_link)] = KIND_CODES['reel']
+        kinds[reaction] = KIND_CODES['reaction']
+        return kinds
+
+
+_classifier = MessageClassifier(SYSTEM_MESSAGES)
+
+
+def add_language(code, phrases):
+    # phrases maps 'reaction', 'reel' and 'attachment' to the export's wording
+    global _classifier
+    SYSTEM_MESSAGES[code] = phrases
+    _classifier = MessageClassifier(SYSTEM_MESSAGES)
+
+
+def phrases_digest():
+    # Changes whenever the registered phrases do, so cached parses are redone
+    return hashlib.sha256(json.dumps(SYSTEM_MESSAGES, sort_keys=True).encode()).hexdigest()[:16]
+
+
+def classify_messages(texts, links):
+    return _classifier.classify(texts, links)
@@ -0,0 +1,179 @@
+import argparse
+import json
+import os
+import pickle
+import sys
+
+import pandas as pd
+
+from .cache import DiskCache
+from .export import collect_chats
+from .frame import load_frame, prepare_frame
+from .parsing import PARSER_ENGINES
+from .filters import MessageFilter
+from .inbox import analyse_inbox, busiest_chats, guess_owner, index_inbox, index_table, top_contacts
+from .incremental import IncrementalAnalysis
+from .profiling import collect
+from .mapreduce import aggregate_files
+from .stats import STATS_VERSION, ChatStats, chat_summary
+
+
+def write_table(table, out):
+    ext = os.path.splitext(out)[1].lower()
+    if ext == '.parquet':
+        table.to_parquet(out, index=False)
+    elif ext == '.csv':
+        table.to_csv(out, index=False)
+    elif ext == '.json':
+        table.to_json(out, orient='records', force_ascii=False)
+    else:
+        raise ValueError(f"Unsupported output format: {out} (use .parquet, .csv or .json)")
+
+
+def message_filter(args):
+    return MessageFilter.create(args.since, args.until, args.sender)
+
+
+def chat_totals(chat, files, args, states, disk_cache, on_error):
+    if args.state:
+        analysis = states.get(chat)
+        if analysis is not None and analysis.stats_version != STATS_VERSION:
+            print(f"{chat}: state was saved by an older version, re-analysing every file", file=sys.stderr)
+        if analysis is None or not analysis.matches(args.include_reels, message_filter(args)):
+            analysis = states[chat] = IncrementalAnalysis(args.include_reels, message_filter(args))
+        return analysis.update(files, on_error, args.engine, args.workers)
+    if args.workers > 1 and disk_cache is None:
+        # Map/reduce: workers return per-file aggregates, not parsed rows
+        return aggregate_files(files, args.include_reels, args.engine, args.workers, on_error, message_filter(args))
+    parsed = load_frame(
+        files, disk_cache, on_error, engine=args.engine, workers=args.workers, message_filter=message_filter(args)
+    )
+    return ChatStats.from_frame(prepare_frame(parsed, args.include_reels))
+
+
+def analyse(args):
+    chats = collect_chats(args.paths)
+    if not chats:
+        print("No message_N.html files found.", file=sys.stderr)
+        return 1
+
+    def on_error(f, e):
+        print(f"Could not parse file {f.name}: {e}", file=sys.stderr)
+
+    disk_cache = DiskCache(args.cache_dir, args.cache_max_mb << 20) if args.cache_dir else None
+
+    # Incremental state: per chat, the aggregates of every file seen so far
+    states = {}
+    if args.state and os.path.exists(args.state):
+        with open(args.state, 'rb') as f:
+            states = pickle.load(f)
+
+    summaries = []
+    profiles = {}
+    for chat, files in sorted(chats.items()):
+        with collect(args.profile_memory) as profiler:
+            totals = chat_totals(chat, files, args, states, disk_cache, on_error)
+            if totals.total:
+                dashboard = totals.dashboard()
+        profiles[chat] = profiler.report()
+        if not totals.total:
+            print(f"{chat}: no valid messages", file=sys.stderr)
+            continue
+        print(f"{chat}: {totals.total} messages from {len(totals.senders)} senders, "
+              f"{totals.first:%Y-%m-%d} to {totals.last:%Y-%m-%d}")
+        summary = chat_summary(dashboard)
+        summary.insert(0, 'chat', chat)
+        summaries.append(summary)
+
+    if args.state:
+        with open(args.state, 'wb') as f:
+            pickle.dump(states, f)
+
+    if args.out and summaries:
+        write_table(pd.concat(summaries, ignore_index=True), args.out)
+    if args.profile:
+        with open(args.profile, 'w') as f:
+            json.dump(profiles, f, indent=2)
+    return 0
+
+
+def inbox(args):
+    chats = collect_chats(args.paths)
+    if args.threads:
+        chats = {thread: files for thread, files in chats.items() if thread in set(args.threads)}
+    if not chats:
+        print("No message_N.html files found.", file=sys.stderr)
+        return 1
+
+    def on_error(f, e):
+        print(f"Could not read {getattr(f, 'name', f)}: {e}", file=sys.stderr)
+
+    index = index_inbox(chats, on_error)
+    print(f"{len(index)} conversations, {sum(info.messages for info in index)} message blocks")
+    if args.index_out:
+        write_table(index_table(index), args.index_out)
+    if args.index_only:
+        for info in index[:args.top]:
+            print(f"  {info.thread}: {info.messages} messages, {len(info.participants)} participants")
+        return 0
+
+    results = analyse_inbox(index, args.include_reels, args.engine, args.workers, on_error, message_filter(args))
+    owner = guess_owner(results) if not args.sender else None
+    print("Busiest chats:")
+    for row in busiest_chats(results, index, args.top).itertuples():
+        print(f"  {row.title} ({row.thread}): {row.messages} messages")
+    print(f"Top contacts{f' (excluding {owner})' if owner else ''}:")
+    for row in top_contacts(results, owner, args.top).itertuples():
+        print(f"  {row.name}: {row.messages} messages in {row.chats} chats")
+
+    if args.out:
+        summaries = []
+        for thread, totals in sorted(results.items()):
+            if totals.total:
+                summary = chat_summary(totals.dashboard())
+                summary.insert(0, 'chat', thread)
+                summaries.append(summary)
+        if summaries:
+            write_table(pd.concat(summaries, ignore_index=True), args.out)
+    return 0
+
+
+def add_filter_arguments(cmd):
+    cmd.add_argument('--since', help="Only messages on or after this date (YYYY-MM-DD)")
+    cmd.add_argument('--until', help="Only messages on or before this date (YYYY-MM-DD)")
+    cmd.add_argument('--sender', action='append', help="Only messages from this sender; repeat for several")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m insta_engine", description="Headless Instagram chat analyser")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    analyse_cmd = commands.add_parser('analyse', help="Analyse exported chats and write their statistics")
+    analyse_cmd.add_argument('paths', nargs='+', help="Export .zip files, chat directories or message_N.html files")
+    analyse_cmd.add_argument('--out', help="Write statistics to a .parquet, .csv or .json file")
+    analyse_cmd.add_argument('--include-reels', action='store_true', help="Count reels, posts and attachments")
+    analyse_cmd.add_argument('--workers', type=int, default=1, help="Parser processes per chat; each file is parsed and aggregated in a worker")
+    analyse_cmd.add_argument('--engine', default='auto', choices=['auto', *PARSER_ENGINES], help="HTML parser engine")
+    analyse_cmd.add_argument('--cache-dir', help="Reuse parsed chats stored as Parquet in this directory")
+    analyse_cmd.add_argument('--cache-max-mb', type=int, default=1024, help="Size limit of the cache directory")
+    analyse_cmd.add_argument('--state', help="Incremental state file: only parse files not analysed in earlier runs")
+    add_filter_arguments(analyse_cmd)
+    analyse_cmd.add_argument('--profile', help="Write per-chat stage timings, row counts and memory to this JSON file")
+    analyse_cmd.add_argument('--profile-memory', action='store_true', help="Report peak traced allocations per stage instead of process RSS (slower)")
+    analyse_cmd.set_defaults(func=analyse)
+
+    inbox_cmd = commands.add_parser('inbox', help="Index and rank every conversation of an export")
+    inbox_cmd.add_argument('paths', nargs='+', help="Export .zip files, chat directories or message_N.html files")
+    inbox_cmd.add_argument('--threads', nargs='+', help="Only these inbox threads (directory names)")
+    inbox_cmd.add_argument('--index-only', action='store_true', help="List the conversations without parsing them")
+    inbox_cmd.add_argument('--index-out', help="Write the conversation index to a .parquet, .csv or .json file")
+    inbox_cmd.add_argument('--out', help="Write statistics of every conversation to a .parquet, .csv or .json file")
+    inbox_cmd.add_argument('--top', type=int, default=10, help="Rows of each ranking to print")
+    inbox_cmd.add_argument('--include-reels', action='store_true', help="Count reels, posts and attachments")
+    inbox_cmd.add_argument('--workers', type=int, default=1, help="Parser processes shared by all conversations")
+    inbox_cmd.add_argument('--engine', default='auto', choices=['auto', *PARSER_ENGINES], help="HTML parser engine")
+    add_filter_arguments(inbox_cmd)
+    inbox_cmd.set_defaults(func=inbox)
+
+    args = parser.parse_args(argv)
+    return args.func(args)
@@ -0,0 +1,70 @@
+from array import array
+
+import numpy as np
+import pandas as pd
+
+KINDS = ('text', 'reaction', 'attachment', 'reel', 'link')
+KIND_CODES = {kind: code for code, kind in enumerate(KINDS)}
+
+
+class MessageColumns:
+    # Column-oriented message buffer filled directly by the parser.
+    # Sender names and kinds are stored as integer codes, so a chat with
+    # millions of messages keeps one string per distinct sender.
+
+    def __init__(self):
+        self.senders = []
+        self._sender_codes = {}
+        self.name_codes = array('i')
+        self.kind_codes = array('b')
+        self.messages = []
+        self.times = []
+
+    def __len__(self):
+        return len(self.messages)
+
+    def __bool__(self):
+        return bool(self.messages)
+
+    def _sender_code(self, name):
+        code = self._sender_codes.get(name)
+        if code is None:
+            code = self._sender_codes[name] = len(self.senders)
+            self.senders.append(name)
+        return code
+
+    @classmethod
+    def from_lists(cls, names, messages, kind_codes, times):
+        # Bulk construction; kind_codes is an int8 array of KIND_CODES values.
+        # The message and time lists are kept as given, not copied, so they
+        # must already hold strings.
+        columns = cls()
+        columns.name_codes = array('i', [columns._sender_code(name or 'Unknown') for name in names])
+        columns.kind_codes = array('b', np.asarray(kind_codes, dtype=np.int8).tobytes())
+        columns.messages = messages
+        columns.times = times
+        return columns
+
+    def extend(self, other):
+        if not other:
+            return
+        remap = np.array([self._sender_code(name) for name in other.senders], dtype=np.intc)
+        self.name_codes.frombytes(remap[np.frombuffer(other.name_codes, dtype=np.intc)].tobytes())
+        self.kind_codes.extend(other.kind_codes)
+        self.messages.extend(other.messages)
+        self.times.extend(other.times)
+
+    @classmethod
+    def concat(cls, parts):
+        merged = cls()
+        for part in parts:
+            merged.extend(part)
+        return merged
+
+    def to_frame(self):
+        return pd.DataFrame({
+            'name': pd.Categorical.from_codes(np.frombuffer(self.name_codes, dtype=np.intc), categories=self.senders),
+            'message': pd.Series(self.messages, dtype=str),
+            'kind': pd.Categorical.from_codes(np.frombuffer(self.kind_codes, dtype=np.byte), categories=KINDS),
+            'time': pd.Series(self.times, dtype=str),
+        })
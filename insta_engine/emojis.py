@@ -0,0 +1,88 @@
+import re
+from collections import Counter
+
+import pandas as pd
+
+# Code points shown as emoji on their own (pictographs, dingbats, symbols)
+EMOJI_CHARS = (
+    "\U0001F300-\U0001F5FF"
+    "\U0001F600-\U0001F64F"
+    "\U0001F680-\U0001F6FF"
+    "\U0001F700-\U0001F77F"
+    "\U0001F780-\U0001F7FF"
+    "\U0001F800-\U0001F8FF"
+    "\U0001F900-\U0001F9FF"
+    "\U0001FA00-\U0001FA6F"
+    "\U0001FA70-\U0001FAFF"
+    "\u2600-\u26FF"
+    "\u2700-\u27BF"
+    "\u231A\u231B\u23E9-\u23EC\u23F0\u23F3\u25FD\u25FE\u2B1B\u2B1C\u2B50\u2B55"
+)
+# Emoji code points that are plain text symbols unless followed by VS16,
+# so "\u00A9 2024" or "Brand\u2122" are not counted
+TEXT_EMOJI_CHARS = (
+    "\u00A9\u00AE\u203C\u2049\u2122\u2139\u2194-\u2199\u21A9\u21AA\u24C2\u25AA\u25AB\u25B6\u25C0"
+    "\u25FB\u25FC\u2328\u23CF\u23ED-\u23EF\u23F1\u23F2\u23F8-\u23FA\u2934\u2935\u2B05-\u2B07"
+    "\u3030\u303D\u3297\u3299"
+)
+
+_REGIONAL = "\U0001F1E6-\U0001F1FF"
+_MODIFIERS = "\U0001F3FB-\U0001F3FF"
+_TAGS = "\U000E0020-\U000E007E"
+_ELEMENT = f"(?:[{EMOJI_CHARS}]\uFE0F?|[{TEXT_EMOJI_CHARS}]\uFE0F)[{_MODIFIERS}]?"
+
+# One token per emoji grapheme, following the UTS #51 sequence grammar:
+# flags (regional indicator pairs), keycaps, subdivision tag sequences, and
+# ZWJ chains of pictographs each carrying an optional VS16 or skin tone.
+EMOJI_PATTERN = re.compile(
+    f"[{_REGIONAL}]{{2}}"
+    f"|[0-9#*]\uFE0F?\u20E3"
+    f"|{_ELEMENT}(?:[{_TAGS}]+\U000E007F|(?:\u200D{_ELEMENT})*)"
+)
+
+# Counting scans for maximal runs of emoji code points instead: a single
+# character class scan is as fast as the plain-run regex this replaced, and
+# only the few distinct runs are then split into graphemes. Every emoji other
+# than a keycap lies inside one run. Keycaps start with a digit, so they are
+# found from their final U+20E3 (a literal the regex engine skips to quickly)
+# by looking back for the digit, and only when the text has one at all.
+_RUN_PATTERN = re.compile(
+    f"[{_REGIONAL}{EMOJI_CHARS}{TEXT_EMOJI_CHARS}]"
+    f"[{_REGIONAL}{EMOJI_CHARS}{TEXT_EMOJI_CHARS}{_MODIFIERS}{_TAGS}\U000E007F\uFE0F\u200D\u20E3]*"
+)
+_KEYCAP_PATTERN = re.compile("\u20E3(?:(?<=([0-9#*])\uFE0F\u20E3)|(?<=([0-9#*])\u20E3))")
+
+
+def extract_emojis(text):
+    if not isinstance(text, str):
+        return []
+    return EMOJI_PATTERN.findall(text)
+
+
+def _count_text(text):
+    counts = Counter()
+    if "\u20E3" in text:
+        for (qualified, bare), n in Counter(_KEYCAP_PATTERN.findall(text)).items():
+            counts[f"{qualified}\uFE0F\u20E3" if qualified else f"{bare}\u20E3"] += n
+    for run, n in Counter(_RUN_PATTERN.findall(text)).items():
+        for emoji in EMOJI_PATTERN.findall(run):
+            counts[emoji] += n
+    return counts
+
+
+def count_emojis(messages):
+    # Scans all messages as one newline-joined buffer, so no per-row list of
+    # matches is ever built. Newlines are outside the emoji ranges, so runs
+    # never merge across messages.
+    return _count_text("\n".join(messages))
+
+
+def emoji_table(df, by):
+    # Emoji counts per value of `by` (e.g. 'name' or 'month_dt') in long form
+    texts = df.groupby(by, observed=True, sort=True)['message'].agg("\n".join)
+    rows = [
+        (key, emoji, count)
+        for key, text in texts.items()
+        for emoji, count in _count_text(text).most_common()
+    ]
+    return pd.DataFrame(rows, columns=[by, 'emoji', 'count'])
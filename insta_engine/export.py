@@ -0,0 +1,102 @@
+import hashlib
+import io
+import mmap
+import os
+import re
+import zipfile
+from collections import defaultdict
+
+# your_instagram_activity/messages/inbox/<thread>/message_<n>.html
+INBOX_MEMBER_RE = re.compile(r"(?:^|/)messages/inbox/([^/]+)/message_\d+\.html$")
+EXPORT_FILE_RE = re.compile(r"message_(\d+)\.html$")
+
+
+class ZipMember:
+    # A message_N.html inside an export archive. Looks like an uploaded file
+    # to the parser, but open() streams the member straight out of the zip
+    # so it is never extracted to disk or fully decompressed into memory.
+
+    def __init__(self, archive, info):
+        self.archive = archive
+        self.info = info
+        self.name = info.filename
+
+    @property
+    def cache_key(self):
+        # The archive already stores a CRC of every member's content
+        return f"zip-crc32:{self.info.CRC:08x}:{self.info.file_size}"
+
+    def open(self):
+        return self.archive.open(self.info)
+
+    def getvalue(self):
+        with self.open() as stream:
+            return stream.read()
+
+
+class LocalFile:
+    # A message_N.html on disk, opened lazily like a zip member
+
+    def __init__(self, path):
+        self.path = os.fspath(path)
+        self.name = self.path
+
+    @property
+    def cache_key(self):
+        digest = hashlib.sha256()
+        with self.open() as f:
+            for chunk in iter(lambda: f.read(1 << 20), b''):
+                digest.update(chunk)
+        return digest.hexdigest()
+
+    def open(self):
+        # Memory-mapped rather than read: pages come straight from the OS page
+        # cache as the parser consumes them, so a file far larger than the
+        # process's free memory can be parsed. mmap cannot map empty files.
+        with open(self.path, 'rb') as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                return io.BytesIO()
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if hasattr(mapped, 'madvise'):
+            # Parsers read front to back, so let the kernel read ahead aggressively
+            mapped.madvise(mmap.MADV_SEQUENTIAL)
+        return mapped
+
+    def getvalue(self):
+        with self.open() as f:
+            return f.read()
+
+
+def export_threads(zip_source):
+    # Maps each inbox thread in the archive to its message_N.html members.
+    # zip_source can be a path or any seekable binary file object.
+    archive = zipfile.ZipFile(zip_source)
+    threads = defaultdict(list)
+    for info in archive.infolist():
+        match = INBOX_MEMBER_RE.search(info.filename)
+        if match and not info.is_dir():
+            threads[match.group(1)].append(ZipMember(archive, info))
+    return dict(threads)
+
+
+def is_zip(uploaded_file):
+    return uploaded_file.name.lower().endswith('.zip')
+
+
+def collect_chats(paths):
+    # Groups command line inputs into chats: every inbox thread of an export
+    # zip, every directory of message_N.html files, and loose html files by
+    # the directory they live in.
+    chats = defaultdict(list)
+    for path in paths:
+        if os.path.isdir(path):
+            files = sorted(f for f in os.listdir(path) if EXPORT_FILE_RE.match(f))
+            chats[os.path.basename(os.path.normpath(path))].extend(
+                LocalFile(os.path.join(path, f)) for f in files
+            )
+        elif path.lower().endswith('.zip'):
+            for thread, members in export_threads(path).items():
+                chats[thread].extend(members)
+        else:
+            chats[os.path.basename(os.path.dirname(os.path.abspath(path)))].append(LocalFile(path))
+    return dict(chats)
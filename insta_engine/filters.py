@@ -0,0 +1,80 @@
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+from .frame import parse_timestamps
+from .inbox import block_senders, edge_times
+from .parsing import source_buffer
+
+
+@dataclass(frozen=True)
+class MessageFilter:
+    # Date range and sender selection pushed down into parsing: files whose
+    # time range or senders cannot match are skipped without being parsed,
+    # and blocks are dropped on their name and timestamp before their body
+    # is decoded or classified. start is inclusive, stop exclusive.
+    start: pd.Timestamp = None
+    stop: pd.Timestamp = None
+    senders: frozenset = None
+
+    @classmethod
+    def create(cls, since=None, until=None, senders=None):
+        # None when nothing is filtered. until is inclusive; a plain date
+        # covers the whole day.
+        start = pd.Timestamp(since) if since is not None else None
+        stop = None
+        if until is not None:
+            until = pd.Timestamp(until)
+            stop = until + pd.Timedelta(days=1) if until == until.normalize() else until + pd.Timedelta(microseconds=1)
+        senders = frozenset(senders) if senders else None
+        if start is None and stop is None and senders is None:
+            return None
+        return cls(start, stop, senders)
+
+    @property
+    def key(self):
+        # Stable text for cache keys
+        senders = ",".join(sorted(self.senders)) if self.senders else ""
+        return f"{self.start}|{self.stop}|{senders}"
+
+    def overlaps(self, first, last):
+        if first is None or last is None:
+            return True
+        return (self.start is None or last >= self.start) and (self.stop is None or first < self.stop)
+
+    def mask(self, names, times):
+        keep = np.ones(len(names), dtype=bool)
+        if self.senders is not None:
+            keep &= np.fromiter(((name or 'Unknown') in self.senders for name in names), dtype=bool, count=len(names))
+        if self.start is not None or self.stop is not None:
+            parsed = parse_timestamps(pd.Series(times, dtype=str))[0]
+            if self.start is not None:
+                keep &= (parsed >= self.start).to_numpy()
+            if self.stop is not None:
+                keep &= (parsed < self.stop).to_numpy()
+        return keep
+
+    def skip_file(self, source):
+        # True when no block of the file can match. Only the first and last
+        # timestamp are read. Senders only rule a file out when every block
+        # has a heading the scan can read; otherwise the block mask decides.
+        with source_buffer(source) as data:
+            if self.start is not None or self.stop is not None:
+                times = parse_timestamps(pd.Series(edge_times(data), dtype=str))[0].dropna()
+                if not times.empty and not self.overlaps(times.min(), times.max()):
+                    return True
+            if self.senders is not None:
+                names = block_senders(data)
+                return names is not None and self._no_sender(names)
+        return False
+
+    def _no_sender(self, names):
+        # Same naming as mask: a block without a sender is 'Unknown'
+        return not any((name or 'Unknown') in self.senders for name in names)
+
+    def skip_thread(self, info):
+        # Same test on a whole conversation, using its index entry
+        if not self.overlaps(info.first, info.last):
+            return True
+        return self.senders is not None and info.senders_complete and self._no_sender(info.participants)
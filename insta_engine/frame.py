@@ -0,0 +1,161 @@
+from datetime import datetime
+
+import pandas as pd
+
+from .classify import phrases_digest
+from .parsing import PARSER_VERSION, get_messages_dictionary
+from .profiling import count, report_table, stage
+
+try:
+    import pyarrow as pa
+except ImportError:  # message text falls back to Python strings
+    pa = None
+
+MEDIA_KINDS = ('attachment', 'reel', 'link')
+WEEKDAYS = ('Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun')
+
+# Compact column types of parsed frames and of the calendar columns added by
+# add_time_columns(). Senders, kinds and weekdays are categoricals (one small
+# integer code per row), calendar parts are the narrowest integers that hold
+# them, and message text is stored in a single Arrow buffer when pyarrow is
+# installed instead of a Python object per row.
+TEXT_DTYPE = pd.StringDtype("pyarrow") if pa is not None else object
+FRAME_SCHEMA = {
+    'name': 'category',
+    'message': TEXT_DTYPE,
+    'kind': 'category',
+    'time': 'datetime64[us]',
+    'length': 'int32',
+}
+TIME_COLUMNS_SCHEMA = {
+    'date': 'datetime64[us]',
+    'month': 'int32',  # months since January 1970
+    'month_dt': 'datetime64[us]',
+    'day': 'int8',
+    'hour': 'int8',
+    'weekday': pd.CategoricalDtype(WEEKDAYS, ordered=True),
+}
+
+# Timestamp layouts seen in exports, most common first
+TIME_FORMATS = ("%b %d, %Y %I:%M %p", "%Y-%m-%d %H:%M:%S", "%d %b %Y %H:%M", "%Y-%m-%d")
+
+
+def visible_mask(kinds, include_reels=False):
+    # Reactions are never counted; shared media only when the toggle is on
+    allowed = ('text',) + MEDIA_KINDS if include_reels else ('text',)
+    return kinds.isin(allowed)
+
+
+def _parse_time_row(time_str):
+    for fmt in TIME_FORMATS:
+        try:
+            return datetime.strptime(time_str, fmt)
+        except Exception:
+            continue
+    return pd.to_datetime(time_str, errors='coerce')
+
+
+def detect_time_format(times, sample_size=200):
+    # A whole export uses one layout, so a small sample is enough to pick it
+    sample = times.dropna().head(sample_size)
+    best, best_hits = None, 0
+    for fmt in TIME_FORMATS:
+        hits = pd.to_datetime(sample, format=fmt, errors='coerce').notna().sum()
+        if hits > best_hits:
+            best, best_hits = fmt, hits
+    return best
+
+
+def parse_timestamps(times):
+    # Converts the whole column with one vectorized call using the detected
+    # format; only entries that format can't read go through the per-row path.
+    # Returns the parsed column and the number of rows that fell back.
+    fmt = detect_time_format(times)
+    if fmt is None:
+        parsed = pd.Series(pd.NaT, index=times.index, dtype='datetime64[us]')
+    else:
+        parsed = pd.to_datetime(times, format=fmt, errors='coerce')
+
+    residual = parsed.isna() & times.notna() & (times != '')
+    fallbacks = int(residual.sum())
+    if fallbacks:
+        parsed[residual] = pd.to_datetime(times[residual].map(_parse_time_row), errors='coerce')
+    return parsed, fallbacks
+
+
+def build_frame(columns):
+    with stage("timestamps") as record:
+        df = columns.to_frame()
+        df['time'], fallbacks = parse_timestamps(df['time'])
+        df = df[df['time'].notna()].reset_index(drop=True)
+        df['message'] = df['message'].astype(TEXT_DTYPE)
+        df['length'] = df['message'].str.len()
+        df = df.astype(FRAME_SCHEMA)
+        df.attrs['timestamp_fallbacks'] = fallbacks
+        record.rows = len(df)
+    count("timestamp_fallbacks", fallbacks)
+    return df
+
+
+def load_frame(uploaded_files, disk_cache=None, on_error=None, **parse_options):
+    # Parsed frame for a chat, read from the on-disk cache when it has one
+    key = None
+    if disk_cache is not None:
+        try:
+            version = f"{PARSER_VERSION}-{phrases_digest()}"
+            message_filter = parse_options.get('message_filter')
+            if message_filter is not None:
+                version = f"{version}-{message_filter.key}"
+            key = disk_cache.key_for(uploaded_files, version)
+        except Exception:
+            key = None
+        df = disk_cache.get(key) if key is not None else None
+        if df is not None:
+            count("disk_cache_hits")
+            return df
+
+    df = build_frame(get_messages_dictionary(uploaded_files, on_error=on_error, **parse_options))
+    if key is not None and not df.empty:
+        disk_cache.put(key, df)
+    return df
+
+
+def add_time_columns(df):
+    # Calendar parts straight from the datetime64 values with integer
+    # arithmetic; no timestamp goes through a string. Weekdays are stored as
+    # codes (Monday is 0) and only carry their labels as categories.
+    times = df['time'].to_numpy(dtype='datetime64[us]')
+    days = times.astype('datetime64[D]')
+    months = times.astype('datetime64[M]')
+    df['date'] = days.astype('datetime64[us]')
+    df['month'] = months.view('int64')
+    df['month_dt'] = months.astype('datetime64[us]')
+    df['day'] = (days - months.astype('datetime64[D]')).view('int64') + 1
+    df['hour'] = times.view('int64') // 3_600_000_000 % 24
+    # 1970-01-01 was a Thursday
+    df['weekday'] = pd.Categorical.from_codes((days.view('int64') + 3) % 7, dtype=TIME_COLUMNS_SCHEMA['weekday'])
+    return df.astype(TIME_COLUMNS_SCHEMA)
+
+
+def memory_report(df):
+    # Bytes per column (deep, so text is counted) and per row
+    usage = df.memory_usage(deep=True)
+    rows = max(len(df), 1)
+    return pd.DataFrame({
+        'column': usage.index,
+        'dtype': ['' if column == 'Index' else str(df[column].dtype) for column in usage.index],
+        'bytes': usage.to_numpy(),
+        'bytes_per_row': usage.to_numpy() / rows,
+    })
+
+
+def prepare_frame(df, include_reels=False):
+    # Rows the dashboard counts. ChatStats buckets the time column itself, so
+    # no derived columns are added; add_time_columns() is there for callers
+    # that want them on the frame.
+    with stage("filter") as record:
+        df = df[visible_mask(df['kind'], include_reels)]
+        df = df.assign(name=df['name'].cat.remove_unused_categories()).reset_index(drop=True)
+        record.rows = len(df)
+    report_table("frame_memory", lambda: memory_report(df))
+    return df
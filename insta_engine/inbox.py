@@ -0,0 +1,171 @@
+import html
+import re
+from collections import Counter
+from dataclasses import dataclass, field
+
+import pandas as pd
+
+from .export import export_threads
+from .frame import parse_timestamps
+from .mapreduce import map_stats
+from .parsing import BLOCK_MARK_RE, TIME_CLASS, export_order, file_source, source_buffer
+from .profiling import stage
+from .stats import ChatStats
+
+TITLE_RE = re.compile(rb'<title>([^<]*)</title>')
+SENDER_RE = re.compile(rb'<h2[^>]*>([^<]*)</h2>')
+TIME_OPEN = b'<div class="' + TIME_CLASS.encode() + b'">'
+
+
+@dataclass
+class ThreadInfo:
+    thread: str
+    title: str = ""
+    participants: list = field(default_factory=list)
+    messages: int = 0
+    first: pd.Timestamp = None
+    last: pd.Timestamp = None
+    files: list = field(default_factory=list)
+    # False when some file's sender headings could not be matched one to
+    # one with its blocks, so participants may miss senders
+    senders_complete: bool = True
+
+
+def _time_at(data, start):
+    # Text of the timestamp div whose opening tag ends at start
+    end = data.find(b'<', start)
+    return html.unescape(data[start:end].decode("utf-8")).strip()
+
+
+def edge_times(data):
+    # Messages are in time order within a file, so its first and last
+    # timestamps bound it whichever way round the file is written
+    return [
+        _time_at(data, pos + len(TIME_OPEN))
+        for pos in (data.find(TIME_OPEN), data.rfind(TIME_OPEN)) if pos >= 0
+    ]
+
+
+def sender_names(data):
+    # Every sender heading in the file, in order, without parsing it
+    for match in SENDER_RE.finditer(data):
+        yield html.unescape(match.group(1).decode("utf-8")).strip()
+
+
+def block_senders(data):
+    # Sender of every block, or None when the headings do not pair up with
+    # the blocks (markup inside a heading, say) and the names cannot be
+    # trusted to cover the file
+    names = list(sender_names(data))
+    return names if len(names) == sum(1 for _ in BLOCK_MARK_RE.finditer(data)) else None
+
+
+def index_thread(thread, files):
+    # What a thread looks like without parsing it: the title, the senders and
+    # block count from a byte scan, and the date range from the first and last
+    # timestamp of each file.
+    info = ThreadInfo(thread)
+    order = export_order([getattr(f, 'name', '') for f in files])
+    info.files = [files[i] for i in order]
+    senders = Counter()
+    bounds = []
+    for source in info.files:
+        with source_buffer(file_source(source)) as data:
+            if not info.title:
+                match = TITLE_RE.search(data)
+                if match:
+                    info.title = html.unescape(match.group(1).decode("utf-8")).strip()
+            blocks = sum(1 for _ in BLOCK_MARK_RE.finditer(data))
+            names = list(sender_names(data))
+            info.messages += blocks
+            info.senders_complete &= len(names) == blocks
+            senders.update(names)
+            bounds.extend(edge_times(data))
+    info.participants = [name for name, _ in senders.most_common()]
+    times = parse_timestamps(pd.Series(bounds, dtype=str))[0].dropna()
+    if not times.empty:
+        info.first, info.last = times.min(), times.max()
+    return info
+
+
+def index_inbox(chats, on_error=None):
+    # {thread: [sources]} (see collect_chats / export_threads) to ThreadInfo
+    # per thread, busiest first
+    index = []
+    with stage("index") as record:
+        for thread, files in chats.items():
+            try:
+                index.append(index_thread(thread, files))
+            except Exception as e:
+                if on_error is not None:
+                    on_error(thread, e)
+        record.rows = len(index)
+    return sorted(index, key=lambda info: info.messages, reverse=True)
+
+
+def index_export(zip_source, on_error=None):
+    return index_inbox(export_threads(zip_source), on_error)
+
+
+def index_table(index):
+    return pd.DataFrame([
+        {
+            'thread': info.thread, 'title': info.title, 'participants': ", ".join(info.participants),
+            'messages': info.messages, 'first': info.first, 'last': info.last, 'files': len(info.files),
+        }
+        for info in index
+    ], columns=['thread', 'title', 'participants', 'messages', 'first', 'last', 'files'])
+
+
+def analyse_inbox(index, include_reels=False, engine="auto", workers=None, on_error=None, message_filter=None):
+    # Parses and aggregates every thread of the index. All files of all
+    # threads go through one map step, so workers stay busy across threads
+    # instead of waiting for each chat's largest file. Threads the filter
+    # rules out from their index entry are not read at all.
+    if message_filter is not None:
+        index = [info for info in index if not message_filter.skip_thread(info)]
+    sources = [(info.thread, source) for info in index for source in info.files]
+    partials = map_stats([source for _, source in sources], include_reels, engine, workers, on_error, message_filter)
+    by_thread = {info.thread: [] for info in index}
+    for (thread, _), partial in zip(sources, partials):
+        if partial is not None:
+            by_thread[thread].append(partial)
+    return {thread: ChatStats.reduce(parts) for thread, parts in by_thread.items()}
+
+
+def guess_owner(results):
+    # The account that exported the inbox takes part in every conversation;
+    # None unless exactly one sender does
+    appearances = Counter(name for stats in results.values() for name in stats.senders)
+    chats = len([stats for stats in results.values() if stats.total])
+    everywhere = [name for name, count in appearances.items() if count == chats]
+    if chats < 2 or len(everywhere) != 1:
+        return None
+    return everywhere[0]
+
+
+def busiest_chats(results, index=None, top=None):
+    titles = {info.thread: info.title for info in index or ()}
+    table = pd.DataFrame([
+        {
+            'thread': thread, 'title': titles.get(thread, thread), 'messages': stats.total,
+            'senders': len(stats.senders), 'first': stats.first, 'last': stats.last,
+        }
+        for thread, stats in results.items() if stats.total
+    ], columns=['thread', 'title', 'messages', 'senders', 'first', 'last'])
+    table = table.sort_values(['messages', 'thread'], ascending=[False, True], ignore_index=True)
+    return table.head(top) if top else table
+
+
+def top_contacts(results, exclude=None, top=None):
+    # Messages per sender summed over every chat, and how many chats they are in
+    messages, chats = Counter(), Counter()
+    for stats in results.values():
+        messages.update(stats.senders)
+        chats.update(stats.senders.keys())
+    table = pd.DataFrame(
+        [(name, count, chats[name]) for name, count in messages.items() if name != exclude],
+        columns=['name', 'messages', 'chats']
+    )
+    table = table.sort_values(['messages', 'name'], ascending=[False, True], ignore_index=True)
+    return table.head(top) if top else table
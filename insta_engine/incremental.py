@@ -0,0 +1,61 @@
+from collections import Counter
+
+from .cache import file_key
+from .mapreduce import map_stats
+from .stats import STATS_VERSION, ChatStats
+
+
+class IncrementalAnalysis:
+    # Keeps the partial aggregates of every file it has analysed, keyed by
+    # content hash. update() parses only files it has not seen and adds their
+    # partials to the running totals; the raw rows are never revisited.
+    # Partials depend on include_reels, message_filter and the ChatStats
+    # layout, so changing any of them needs a new instance (see matches()).
+
+    message_filter = None  # states pickled before filters existed
+    stats_version = 0      # states pickled before partials were versioned
+
+    def __init__(self, include_reels=False, message_filter=None):
+        self.include_reels = include_reels
+        self.message_filter = message_filter
+        self.stats_version = STATS_VERSION
+        self.partials = {}
+        self.keys = Counter()
+        self.totals = ChatStats()
+
+    def matches(self, include_reels, message_filter):
+        # False when the stored partials cannot be reused for these settings
+        return (self.stats_version == STATS_VERSION and self.include_reels == include_reels
+                and self.message_filter == message_filter)
+
+    def update(self, uploaded_files, on_error=None, engine="auto", workers=None):
+        keys = [None] * len(uploaded_files)
+        new = {}
+        for i, uploaded_file in enumerate(uploaded_files):
+            try:
+                keys[i] = file_key(uploaded_file)
+            except Exception as e:
+                if on_error is not None:
+                    on_error(uploaded_file, e)
+                continue
+            if keys[i] not in self.partials:
+                new.setdefault(keys[i], uploaded_file)
+
+        # Only unseen files are parsed, in parallel when workers > 1
+        partials = map_stats(list(new.values()), self.include_reels, engine, workers, on_error, self.message_filter)
+        for key, partial in zip(new, partials):
+            if partial is not None:
+                self.partials[key] = partial
+
+        current = Counter(key for key in keys if key in self.partials)
+        if self.keys - current:
+            # Files were removed or replaced: rebuild the totals from partials
+            self.totals = ChatStats()
+            added = current
+        else:
+            added = current - self.keys
+        self.totals = ChatStats.reduce(
+            [self.totals] + [self.partials[key] for key, count in added.items() for _ in range(count)]
+        )
+        self.keys = current
+        return self.totals
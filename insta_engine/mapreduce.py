@@ -0,0 +1,60 @@
+from concurrent.futures import ProcessPoolExecutor
+
+from .frame import build_frame, prepare_frame
+from .parsing import file_source, parse_html, worker_source
+from .profiling import stage
+from .stats import ChatStats
+
+
+def file_stats(source, include_reels=False, engine="auto", message_filter=None):
+    # Map step: one file in, its ChatStats out. Runs inside worker processes,
+    # so only the aggregates travel back to the parent, never message text.
+    df = build_frame(parse_html(source, engine, message_filter))
+    return ChatStats.from_frame(prepare_frame(df, include_reels))
+
+
+def map_stats(uploaded_files, include_reels=False, engine="auto", workers=None, on_error=None, message_filter=None):
+    # Per-file ChatStats aligned with uploaded_files (None where parsing failed).
+    # Stages run inside worker processes are not seen by the parent's profiler,
+    # so the whole map step is timed as one stage.
+    with stage("map") as record:
+        partials = _map_files(uploaded_files, include_reels, engine, workers, on_error, message_filter)
+        record.rows = sum(p.total for p in partials if p is not None)
+    return partials
+
+
+def _map_files(uploaded_files, include_reels, engine, workers, on_error, message_filter):
+    partials = [None] * len(uploaded_files)
+
+    def report(uploaded_file, e):
+        if on_error is not None:
+            on_error(uploaded_file, e)
+
+    if workers and workers > 1 and len(uploaded_files) > 1:
+        with ProcessPoolExecutor(max_workers=min(workers, len(uploaded_files))) as pool:
+            futures = []
+            for i, uploaded_file in enumerate(uploaded_files):
+                try:
+                    source = worker_source(file_source(uploaded_file))
+                except Exception as e:
+                    report(uploaded_file, e)
+                    continue
+                futures.append((i, uploaded_file, pool.submit(file_stats, source, include_reels, engine, message_filter)))
+            for i, uploaded_file, future in futures:
+                try:
+                    partials[i] = future.result()
+                except Exception as e:
+                    report(uploaded_file, e)
+    else:
+        for i, uploaded_file in enumerate(uploaded_files):
+            try:
+                partials[i] = file_stats(file_source(uploaded_file), include_reels, engine, message_filter)
+            except Exception as e:
+                report(uploaded_file, e)
+    return partials
+
+
+def aggregate_files(uploaded_files, include_reels=False, engine="auto", workers=None, on_error=None, message_filter=None):
+    # Reduce step: the chat's totals, merged from the per-file partials
+    partials = map_stats(uploaded_files, include_reels, engine, workers, on_error, message_filter)
+    return ChatStats.reduce(p for p in partials if p is not None)
@@ -0,0 +1,356 @@
+import codecs
+import html
+import io
+import mmap
+import re
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from itertools import compress
+
+from bs4 import BeautifulSoup
+
+from .cache import content_hash, file_key
+from .classify import classify_messages
+from .columns import MessageColumns
+from .export import EXPORT_FILE_RE, LocalFile
+from .profiling import count, stage
+
+try:
+    from lxml import etree
+except ImportError:  # lxml is optional, BeautifulSoup's html.parser is always available
+    etree = None
+
+# Class signatures of the Instagram HTML export template
+BLOCK_CLASSES = {"pam", "uiBoxWhite", "noborder"}
+MESSAGE_CLASS = "_3-95 _a6-p"
+TIME_CLASS = "_3-94 _a6-o"
+
+# Bytes read from a file stream at a time when decoding it as a whole
+READ_CHUNK_SIZE = 1 << 20
+
+# Bump whenever parsed output changes, so on-disk caches are not reused
+PARSER_VERSION = 2
+
+
+def _read_source(source):
+    # Sources are raw bytes/str or a lazily opened file such as a zip member
+    if hasattr(source, 'open'):
+        return source.getvalue()
+    return source
+
+
+def _open_source(source):
+    if hasattr(source, 'open'):
+        return source.open()
+    return io.BytesIO(source if isinstance(source, bytes) else source.encode("utf-8"))
+
+
+def file_source(uploaded_file):
+    # Zip members and local files are parsed as streams; uploads are already in memory
+    return uploaded_file if hasattr(uploaded_file, 'open') else uploaded_file.getvalue()
+
+
+def worker_source(source):
+    # Local files are sent to worker processes by path, anything else as bytes
+    return source if isinstance(source, LocalFile) else _read_source(source)
+
+
+def _decode_source(source):
+    # BeautifulSoup needs the whole document as text. Streamed sources are
+    # decoded chunk by chunk, so the raw bytes are never held in full next to
+    # the decoded text.
+    if not hasattr(source, 'open'):
+        return source if isinstance(source, str) else str(source, "utf-8")
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    with source.open() as stream:
+        parts = [decoder.decode(chunk) for chunk in iter(lambda: stream.read(READ_CHUNK_SIZE), b'')]
+    parts.append(decoder.decode(b'', final=True))
+    return "".join(parts)
+
+
+def _filter_blocks(blocks, message_filter):
+    # Drops the blocks a MessageFilter rejects, judged on all names and
+    # timestamps at once
+    if message_filter is None:
+        return blocks
+    blocks = list(blocks)
+    keep = message_filter.mask([block[0] for block in blocks], [block[3] for block in blocks])
+    return list(compress(blocks, keep))
+
+
+def iter_messages_soup(source, message_filter=None):
+    yield from _filter_blocks(_iter_soup_blocks(source), message_filter)
+
+
+def _iter_soup_blocks(source):
+    soup = BeautifulSoup(_decode_source(source), 'html.parser')
+
+    for msg in soup.select('div.pam.uiBoxWhite.noborder'):
+        name_tag = msg.find('h2')
+        message_tag = msg.find('div', class_=MESSAGE_CLASS)
+        time_tag = msg.find('div', class_=TIME_CLASS)
+
+        if not (name_tag and message_tag and time_tag):
+            continue
+
+        link_tag = message_tag.find('a')
+        yield (
+            name_tag.get_text(strip=True),
+            message_tag.get_text(" ", strip=True),
+            link_tag.get_text() if link_tag is not None else None,
+            time_tag.get_text(strip=True),
+        )
+
+
+def _text(elem, sep=""):
+    # Mirrors BeautifulSoup's get_text(sep, strip=True)
+    return sep.join(s.strip() for s in elem.itertext() if s.strip())
+
+
+def _find_div(block, class_name):
+    for div in block.iter('div'):
+        if div.get('class') == class_name:
+            return div
+    return None
+
+
+def iter_messages_lxml(source, message_filter=None):
+    if etree is None:
+        raise RuntimeError("lxml is not installed")
+
+    # Only the current message block is ever held in memory: every block is
+    # cleared once read and already-processed siblings are dropped from the tree.
+    with _open_source(source) as stream:
+        yield from _filter_blocks(_iterparse_blocks(stream), message_filter)
+
+
+def _iterparse_blocks(stream):
+    for _, elem in etree.iterparse(stream, events=("end",), tag="div", html=True, encoding="utf-8"):
+        if not BLOCK_CLASSES.issubset((elem.get('class') or "").split()):
+            continue
+
+        name_tag = next(elem.iter('h2'), None)
+        message_tag = _find_div(elem, MESSAGE_CLASS)
+        time_tag = _find_div(elem, TIME_CLASS)
+
+        if name_tag is not None and message_tag is not None and time_tag is not None:
+            link_tag = next(message_tag.iter('a'), None)
+            yield (
+                _text(name_tag),
+                _text(message_tag, " "),
+                "".join(link_tag.itertext()) if link_tag is not None else None,
+                _text(time_tag),
+            )
+
+        elem.clear()
+        parent = elem.getparent()
+        if parent is not None:
+            while elem.getprevious() is not None:
+                del parent[0]
+
+
+# The exact markup of one message block in a standard export. Names and
+# timestamps are plain text; the body is everything up to the timestamp div,
+# whose opening tag cannot occur inside escaped message text. The body never
+# runs into the next block, so a block without the expected timestamp div
+# fails at the next block instead of scanning the rest of the file.
+FAST_BLOCK_OPEN = b'<div class="pam _3-95 _2ph- _a6-g uiBoxWhite noborder">'
+FAST_BLOCK_RE = re.compile(
+    re.escape(FAST_BLOCK_OPEN)
+    + rb'<h2 class="[^"]*">([^<]*)</h2><div class="' + MESSAGE_CLASS.encode() + rb'">'
+    # A plain text message has no tags or entities to strip
+    + rb'(?:<div><div></div><div>([^<&]*)</div><div></div><div></div></div>'
+    + rb'|((?:[^<]|<(?!div class="pam ))*?))</div>'
+    + rb'<div class="' + TIME_CLASS.encode() + rb'">([^<]*)</div></div>',
+    re.S
+)
+# Any block the full parsers would consider, whatever its exact markup
+BLOCK_MARK_RE = re.compile(rb'uiBoxWhite')
+TAG_RE = re.compile(r'<[^>]*>')
+LINK_RE = re.compile(r'<a\b[^>]*>(.*?)</a>', re.S)
+
+
+class TemplateMismatch(ValueError):
+    pass
+
+
+@contextmanager
+def source_buffer(source):
+    # The whole document as one bytes-like buffer; local files stay memory-mapped
+    if isinstance(source, LocalFile):
+        with source.open() as data:
+            yield data if isinstance(data, mmap.mmap) else data.getvalue()
+    elif hasattr(source, 'open'):
+        yield source.getvalue()
+    elif isinstance(source, str):
+        yield source.encode("utf-8")
+    else:
+        yield source
+
+
+def _fragment_text(fragment, sep=""):
+    # get_text(sep, strip=True) of a markup fragment without building a tree
+    if '<' not in fragment and '&' not in fragment:
+        return fragment.strip()
+    parts = (html.unescape(s).strip() for s in TAG_RE.split(fragment))
+    return sep.join(s for s in parts if s)
+
+
+def iter_messages_fast(source, message_filter=None):
+    # Scans the raw bytes for the fixed block template instead of building a
+    # DOM. Raises TemplateMismatch unless every block in the file has exactly
+    # the standard markup, so a partial result is never returned. A filter is
+    # applied on the raw names and timestamps, before any body is decoded.
+    with source_buffer(source) as data:
+        expected = sum(1 for _ in BLOCK_MARK_RE.finditer(data))
+        if not expected:
+            raise TemplateMismatch("No message blocks found")
+        blocks = FAST_BLOCK_RE.findall(data)
+    if len(blocks) != expected:
+        raise TemplateMismatch(f"{expected - len(blocks)} of {expected} message blocks do not match the export template")
+
+    names = [_fragment_text(block[0].decode("utf-8")) for block in blocks]
+    times = [_fragment_text(block[3].decode("utf-8")) for block in blocks]
+    rows = zip(names, blocks, times)
+    if message_filter is not None:
+        rows = compress(rows, message_filter.mask(names, times))
+
+    for name, (_, text, body, _), time in rows:
+        if body:
+            body = body.decode("utf-8")
+            link = LINK_RE.search(body)
+            text = _fragment_text(body, " ")
+            link = "".join(html.unescape(s) for s in TAG_RE.split(link.group(1))) if link is not None else None
+        else:
+            text, link = text.decode("utf-8").strip(), None
+        yield name, text, link, time
+
+
+PARSER_ENGINES = {
+    'fast': iter_messages_fast,
+    'lxml': iter_messages_lxml,
+    'soup': iter_messages_soup,
+}
+
+
+def _collect(blocks):
+    # Engines yield (name, text, link text, time) per message block; kinds are
+    # assigned afterwards in one pass over the whole text column. Reactions
+    # are tagged rather than dropped, so toggling reels in the UI is a mask
+    # over the parsed rows instead of a re-parse.
+    names, texts, links, times = [], [], [], []
+    for name, text, link, time in blocks:
+        names.append(name)
+        texts.append(text or '')
+        links.append(link)
+        times.append(time or '')
+    # Shared posts and reels are stored as their link, everything else as text
+    messages = [text if link is None else f"Attachment: {link}" for text, link in zip(texts, links)]
+    return MessageColumns.from_lists(names, messages, classify_messages(texts, links), times)
+
+
+def parse_html(source, engine="auto", message_filter=None):
+    if engine == "auto":
+        # Standard exports take the template fast path; anything else goes
+        # through a real HTML parser
+        engines = ["fast", "lxml", "soup"] if etree is not None else ["fast", "soup"]
+    elif engine == "soup":
+        engines = ["soup"]
+    elif engine in PARSER_ENGINES:
+        engines = [engine, "soup"]
+    else:
+        raise ValueError(f"Unknown parser engine: {engine}")
+
+    # Files entirely outside the filter are not parsed at all
+    if message_filter is not None and message_filter.skip_file(source):
+        count("files_skipped")
+        return MessageColumns()
+
+    # The fast path and the streaming engine are strict about markup they
+    # cannot handle; such files are re-parsed by the next engine, down to
+    # the BeautifulSoup fallback. The fast path raises rather than find
+    # nothing, so an empty result from it means everything was filtered out.
+    for name in engines[:-1]:
+        try:
+            messages = _collect(PARSER_ENGINES[name](source, message_filter))
+        except Exception:
+            messages = None
+        if messages or (messages is not None and name == "fast"):
+            return messages
+        count(f"{name}_fallbacks")
+    return _collect(PARSER_ENGINES[engines[-1]](source, message_filter))
+
+
+def export_order(names):
+    # Instagram numbers files newest first (message_1.html holds the latest
+    # messages), so the highest index is the oldest part of the chat
+    def key(item):
+        i, name = item
+        match = EXPORT_FILE_RE.search(name or "")
+        return (-int(match.group(1)) if match else 0, i)
+    return [i for i, _ in sorted(enumerate(names), key=key)]
+
+
+def get_messages_dictionary(uploaded_files, engine="auto", on_error=None, cache=None, workers=None, message_filter=None):
+    if not uploaded_files:
+        return MessageColumns()
+
+    with stage("parse") as record:
+        columns = _parse_files(uploaded_files, engine, on_error, cache, workers, message_filter)
+        record.rows = len(columns)
+    return columns
+
+
+def _parse_files(uploaded_files, engine, on_error, cache, workers, message_filter):
+    def report(uploaded_file, e):
+        if on_error is not None:
+            on_error(uploaded_file, e)
+
+    results = {}
+    pending = []
+
+    for i, uploaded_file in enumerate(uploaded_files):
+        try:
+            source = file_source(uploaded_file)
+            key = records = None
+            if cache is not None:
+                key = file_key(uploaded_file) if hasattr(uploaded_file, 'open') else content_hash(source)
+                if message_filter is not None:
+                    key = f"{key}:{message_filter.key}"
+                records = cache.get(key)
+        except Exception as e:
+            report(uploaded_file, e)
+            continue
+        if records is None:
+            pending.append((i, uploaded_file, key, source))
+        else:
+            results[i] = records
+            count("parse_cache_hits")
+    count("files_parsed", len(pending))
+
+    def store(i, key, records):
+        results[i] = records
+        if cache is not None:
+            cache.put(key, records)
+
+    if workers and workers > 1 and len(pending) > 1:
+        with ProcessPoolExecutor(max_workers=min(workers, len(pending))) as pool:
+            futures = [
+                (i, uploaded_file, key, pool.submit(parse_html, worker_source(source), engine, message_filter))
+                for i, uploaded_file, key, source in pending
+            ]
+            for i, uploaded_file, key, future in futures:
+                try:
+                    store(i, key, future.result())
+                except Exception as e:
+                    report(uploaded_file, e)
+    else:
+        for i, uploaded_file, key, source in pending:
+            try:
+                store(i, key, parse_html(source, engine, message_filter))
+            except Exception as e:
+                report(uploaded_file, e)
+
+    # Merge per-file results oldest file first, independent of completion order
+    names = [getattr(uploaded_file, 'name', '') for uploaded_file in uploaded_files]
+    return MessageColumns.concat(results[i] for i in export_order(names) if i in results)
@@ -0,0 +1,127 @@
+import json
+import os
+import sys
+import time
+import tracemalloc
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import asdict, dataclass
+
+_active = ContextVar('insta_profiler', default=None)
+
+
+def peak_rss_mb():
+    # Peak resident set size so far, None where unavailable (Windows)
+    try:
+        import resource  # POSIX only
+    except ImportError:
+        return None
+    # ru_maxrss is in bytes on macOS and in kilobytes elsewhere
+    maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return maxrss / 2**20 if sys.platform == 'darwin' else maxrss / 1024
+
+
+def rss_mb():
+    # Current resident set size; falls back to the peak where /proc is missing
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 2**20
+    except (OSError, ValueError, AttributeError):
+        return peak_rss_mb()
+
+
+@dataclass
+class StageRecord:
+    name: str
+    seconds: float = 0.0
+    rows: int = None
+    memory_mb: float = None
+
+
+class Profiler:
+    # Collects wall time, rows and memory of every pipeline stage run while
+    # it is active, plus free-form counters (cache hits, parser fallbacks...).
+    # memory_mb is the process RSS after the stage, or with trace_memory the
+    # peak traced Python allocation during it (nested stages included).
+
+    def __init__(self, trace_memory=False):
+        self.trace_memory = trace_memory
+        self.stages = []
+        self.open_stages = []
+        self.counters = Counter()
+        self.tables = {}
+
+    def report(self):
+        return {
+            'stages': [asdict(record) for record in self.stages],
+            'counters': dict(self.counters),
+            'tables': {name: table.to_dict(orient='records') for name, table in self.tables.items()},
+        }
+
+    def to_json(self, **kwargs):
+        return json.dumps(self.report(), **kwargs)
+
+
+@contextmanager
+def collect(trace_memory=False):
+    profiler = Profiler(trace_memory)
+    started_tracing = trace_memory and not tracemalloc.is_tracing()
+    if started_tracing:
+        tracemalloc.start()
+    token = _active.set(profiler)
+    try:
+        yield profiler
+    finally:
+        _active.reset(token)
+        if started_tracing:
+            tracemalloc.stop()
+
+
+@contextmanager
+def stage(name):
+    # Times the enclosed block when a profiler is active, and costs a single
+    # ContextVar lookup otherwise. Set .rows on the yielded record to report
+    # how many rows the stage produced.
+    profiler = _active.get()
+    record = StageRecord(name)
+    if profiler is None:
+        yield record
+        return
+    if profiler.trace_memory:
+        # Resetting the peak would lose it for the enclosing stages, so it is
+        # folded into every stage still open first
+        _fold_peak(profiler.open_stages)
+        tracemalloc.reset_peak()
+    profiler.open_stages.append(record)
+    start = time.perf_counter()
+    try:
+        yield record
+    finally:
+        record.seconds = time.perf_counter() - start
+        profiler.open_stages.pop()
+        if profiler.trace_memory:
+            _fold_peak([record])
+        else:
+            record.memory_mb = rss_mb()
+        profiler.stages.append(record)
+
+
+def _fold_peak(records):
+    peak = tracemalloc.get_traced_memory()[1] / 2**20
+    for record in records:
+        record.memory_mb = max(record.memory_mb or 0.0, peak)
+
+
+def count(name, n=1):
+    profiler = _active.get()
+    if profiler is not None:
+        profiler.counters[name] += n
+
+
+def report_table(name, build):
+    # Attaches a DataFrame to the active profiler's report; build is only
+    # called while profiling, so costly reports are free otherwise
+    profiler = _active.get()
+    if profiler is not None:
+        profiler.tables[name] = build()
@@ -0,0 +1,237 @@
+import hashlib
+from collections import Counter
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+from .emojis import count_emojis
+from .frame import WEEKDAYS
+from .profiling import stage
+
+TIME_DTYPE = 'datetime64[us]'
+# Bump whenever ChatStats gains or changes a field, so partials saved by an
+# older version are rebuilt instead of merged
+STATS_VERSION = 1
+CALENDAR_WEEKS = 53
+
+
+@dataclass
+class DashboardStats:
+    total: int
+    senders: pd.DataFrame   # name, count, length (most active first)
+    emojis: pd.DataFrame    # emoji, count (most used first)
+    hours: pd.DataFrame     # hour 0-23, count
+    weekly: pd.DataFrame    # week (W-MON bucket end), count, empty weeks included
+    monthly: pd.DataFrame   # month_dt, count, active months only
+    heatmap: pd.DataFrame   # week rank 1-4 x month, last 12 months
+    calendar: pd.DataFrame  # weekday Mon-Sun x 53 weeks up to the last day, NaN after it
+
+    def fingerprint(self):
+        # Content hash of every table, so anything derived from them (e.g.
+        # rendered figures) can be reused while the statistics are unchanged
+        digest = hashlib.sha256(str(self.total).encode())
+        for table in (self.senders, self.emojis, self.hours, self.weekly, self.monthly, self.heatmap, self.calendar):
+            digest.update(str(list(table.columns)).encode())
+            digest.update(pd.util.hash_pandas_object(table).to_numpy().tobytes())
+        return digest.hexdigest()
+
+
+class ChatStats:
+    # Partial aggregates of a slice of a chat (e.g. one message_N.html).
+    # Everything is a count or sum keyed by sender, emoji or integer time
+    # bucket, so partials combine by adding them up: merge() is associative
+    # and ChatStats() is its identity. Partials carry no message text, which
+    # keeps them cheap to send back from worker processes.
+
+    def __init__(self):
+        self.total = 0
+        self.length = 0
+        self.first = self.last = None
+        self.senders = Counter()
+        self.sender_lengths = Counter()
+        self.emojis = Counter()
+        self.hours = np.zeros(24, dtype=np.int64)
+        self.weeks = Counter()    # W-MON bucket end as days since epoch
+        self.months = Counter()   # months since 1970-01
+        self.days = Counter()     # days since epoch
+
+    @classmethod
+    def from_frame(cls, df):
+        with stage("aggregate") as record:
+            stats = cls._from_frame(df)
+            record.rows = stats.total
+        return stats
+
+    @classmethod
+    def _from_frame(cls, df):
+        # One conversion of the time column to integer day numbers; hour,
+        # day, week and month histograms are bincounts over those buckets.
+        stats = cls()
+        if df.empty:
+            return stats
+        times = df['time'].to_numpy()
+        day_start = times.astype('datetime64[D]')
+        days = day_start.astype(np.int64)
+        hours = (times - day_start).astype('timedelta64[h]').astype(np.int64)
+
+        first_day = days.min()
+        day_counts = np.bincount(days - first_day)
+
+        # 1970-01-01 was a Thursday; W-MON buckets end on (and include) a Monday
+        week_end = days + (7 - (days + 3) % 7) % 7
+        first_week = week_end.min()
+        week_counts = np.bincount((week_end - first_week) // 7)
+
+        months = day_start.astype('datetime64[M]').astype(np.int64)
+        first_month = months.min()
+        month_counts = np.bincount(months - first_month)
+
+        stats.total = len(df)
+        stats.length = int(df['length'].sum())
+        stats.first, stats.last = df['time'].min(), df['time'].max()
+        stats.senders = Counter(df['name'].value_counts().loc[lambda c: c > 0].to_dict())
+        stats.sender_lengths = Counter(df.groupby('name', observed=True)['length'].sum().astype(int).to_dict())
+        with stage("emojis") as record:
+            stats.emojis = count_emojis(df['message'])
+            record.rows = sum(stats.emojis.values())
+        stats.hours = np.bincount(hours, minlength=24)
+        stats.weeks = Counter({int(first_week + 7 * i): int(c) for i, c in enumerate(week_counts) if c})
+        stats.months = Counter({int(first_month + i): int(c) for i, c in enumerate(month_counts) if c})
+        stats.days = Counter({int(first_day + i): int(c) for i, c in enumerate(day_counts) if c})
+        return stats
+
+    def _add(self, other):
+        # In-place accumulation; only used on fresh instances so partials
+        # handed to merge() are never mutated
+        if other.total:
+            self.first = other.first if self.first is None else min(self.first, other.first)
+            self.last = other.last if self.last is None else max(self.last, other.last)
+        self.total += other.total
+        self.length += other.length
+        self.senders.update(other.senders)
+        self.sender_lengths.update(other.sender_lengths)
+        self.emojis.update(other.emojis)
+        self.hours = self.hours + other.hours
+        self.weeks.update(other.weeks)
+        self.months.update(other.months)
+        self.days.update(other.days)
+
+    def merge(self, other):
+        merged = ChatStats()
+        merged._add(self)
+        merged._add(other)
+        return merged
+
+    __add__ = merge
+
+    @classmethod
+    def reduce(cls, partials):
+        total = cls()
+        for partial in partials:
+            total._add(partial)
+        return total
+
+    def dashboard(self):
+        with stage("tables") as record:
+            dashboard = self._dashboard()
+            record.rows = dashboard.total
+        return dashboard
+
+    def _dashboard(self):
+        # Tables for a non-empty chat, in the shape the charts expect
+        first_week, last_week = min(self.weeks), max(self.weeks)
+        week_days = np.arange(first_week, last_week + 1, 7)
+        weekly = pd.DataFrame({
+            'week': week_days.astype('datetime64[D]').astype(TIME_DTYPE),
+            'count': np.array([self.weeks.get(int(d), 0) for d in week_days], dtype=np.int64),
+        })
+        active = sorted(self.months)
+        monthly = pd.DataFrame({
+            'month_dt': np.array(active).astype('datetime64[M]').astype(TIME_DTYPE),
+            'count': np.array([self.months[m] for m in active], dtype=np.int64),
+        })
+        return DashboardStats(
+            total=self.total,
+            senders=pd.DataFrame(
+                [(name, count, self.sender_lengths[name]) for name, count in self.senders.most_common()],
+                columns=['name', 'count', 'length']
+            ),
+            emojis=pd.DataFrame(self.emojis.most_common(), columns=['emoji', 'count']),
+            hours=pd.DataFrame({'hour': np.arange(24), 'count': self.hours}),
+            weekly=weekly,
+            monthly=monthly,
+            heatmap=weekly_heatmap(weekly),
+            calendar=calendar_heatmap(self.days),
+        )
+
+
+def compute_stats(df):
+    return ChatStats.from_frame(df).dashboard()
+
+
+def weekly_heatmap(weekly):
+    # Weeks of the last 12 months, folded into up to 4 week rows per month.
+    # weekly is contiguous and in time order, so a week's rank within its
+    # month is its distance from the month's first week.
+    days = weekly['week'].to_numpy().astype('datetime64[D]')
+    months = days.astype('datetime64[M]').astype(np.int64)
+    if not len(months):
+        return pd.DataFrame(index=pd.RangeIndex(1, 5, name='week_rank'))
+    ranks = np.minimum(np.arange(len(months)) - np.searchsorted(months, months), 3)
+
+    first_month = max(months[0], months[-1] - 11)
+    keep = months >= first_month
+    n_months = months[-1] - first_month + 1
+    cells = np.bincount(
+        (months[keep] - first_month) * 4 + ranks[keep],
+        weights=weekly['count'].to_numpy()[keep], minlength=n_months * 4
+    )
+    columns = np.arange(first_month, months[-1] + 1).astype('datetime64[M]').astype(TIME_DTYPE)
+    return pd.DataFrame(
+        cells.reshape(n_months, 4).T.astype(np.int64),
+        index=pd.RangeIndex(1, 5, name='week_rank'),
+        columns=pd.DatetimeIndex(columns, name='month_date'),
+    )
+
+
+def calendar_heatmap(days, weeks=CALENDAR_WEEKS):
+    # GitHub-style grid of daily counts: one row per weekday (Monday first)
+    # and one column per week, the last column holding the last active day.
+    # days maps days since epoch to counts; cells after the last day are NaN.
+    if not days:
+        return pd.DataFrame(index=pd.Index(WEEKDAYS, name='weekday'))
+    day_numbers = np.fromiter(days.keys(), dtype=np.int64, count=len(days))
+    counts = np.fromiter(days.values(), dtype=np.int64, count=len(days))
+    last_day = day_numbers.max()
+    # 1970-01-01 was a Thursday, so (day + 3) % 7 is 0 on Mondays
+    first_day = last_day - (last_day + 3) % 7 - 7 * (weeks - 1)
+    keep = day_numbers >= first_day
+    cells = np.bincount(day_numbers[keep] - first_day, weights=counts[keep], minlength=7 * weeks)
+    cells[last_day - first_day + 1:] = np.nan
+    columns = (first_day + 7 * np.arange(weeks)).astype('datetime64[D]').astype(TIME_DTYPE)
+    return pd.DataFrame(
+        cells.reshape(weeks, 7).T,
+        index=pd.Index(WEEKDAYS, name='weekday'),
+        columns=pd.DatetimeIndex(columns, name='week'),
+    )
+
+
+def chat_summary(stats):
+    # Every dashboard table in long form: one (metric, key, count) row each
+    tables = [
+        ('sender', stats.senders, 'name'),
+        ('sender_length', stats.senders.rename(columns={'count': 'messages', 'length': 'count'}), 'name'),
+        ('emoji', stats.emojis, 'emoji'),
+        ('hour', stats.hours, 'hour'),
+        ('week', stats.weekly, 'week'),
+        ('month', stats.monthly, 'month_dt'),
+    ]
+    parts = [pd.DataFrame({'metric': ['messages'], 'key': [''], 'count': [stats.total]})]
+    for metric, table, key in tables:
+        parts.append(pd.DataFrame({
+            'metric': metric,
+            'key': table[key].astype(str),
+            'count': table['count'].astype('int64'),
+        }))
+    return pd.concat(parts, ignore_index=True)
@@ -0,0 +1,63 @@
+import random
+
+import numpy as np
+
+from insta_engine.classify import PHRASE_KINDS, REEL_LINK, SYSTEM_MESSAGES, MessageClassifier, classify_messages
+from insta_engine.columns import KIND_CODES
+
+
+def classify_one(text, link, languages=SYSTEM_MESSAGES):
+    # The per-message rules the vectorized classifier replaced
+    def has(kind):
+        return any(phrase in text for phrases in languages.values() for phrase in phrases.get(kind, ()))
+
+    if has('reaction'):
+        return 'reaction'
+    if link is not None:
+        return 'reel' if REEL_LINK in link or has('reel') else 'link'
+    if has('reel'):
+        return 'reel'
+    if has('attachment'):
+        return 'attachment'
+    return 'text'
+
+
+def random_texts(rng, n, languages=SYSTEM_MESSAGES):
+    phrases = [p for phrases in languages.values() for kind in PHRASE_KINDS for p in phrases.get(kind, ())]
+    pieces = phrases + [p[:-1] for p in phrases] + ["", " ", "hi", "a", "Reac", "\0", "\U0001F602", "sent an"]
+    links = [None, None, None, "https://www.instagram.com/reel/C1/", "https://www.instagram.com/p/B1/"]
+    texts = ["".join(rng.choice(pieces) for _ in range(rng.randint(0, 4))) for _ in range(n)]
+    return texts, [rng.choice(links) for _ in range(n)]
+
+
+def expected(texts, links, languages=SYSTEM_MESSAGES):
+    return np.array([KIND_CODES[classify_one(t, l, languages)] for t, l in zip(texts, links)], dtype=np.int8)
+
+
+def test_matches_per_message_rules():
+    rng = random.Random(0)
+    for _ in range(20):
+        texts, links = random_texts(rng, 2500)
+        np.testing.assert_array_equal(classify_messages(texts, links), expected(texts, links))
+
+
+def test_phrases_at_row_edges():
+    # Offsets of matches at the first and last character of a row, and of
+    # empty rows next to them, must map back to the right row
+    texts = ["Reacted", "", "sent an attachment", "shared a reel", "", "x Liked a message", "Liked a messag"]
+    links = [None] * len(texts)
+    np.testing.assert_array_equal(classify_messages(texts, links), expected(texts, links))
+    assert len(classify_messages([], [])) == 0
+
+
+def test_nested_phrases_across_languages():
+    # A phrase containing a phrase of a better ranked kind takes that rank,
+    # even though matches never overlap and the longer phrase is tried first
+    languages = {
+        'en': SYSTEM_MESSAGES['en'],
+        'xx': {'reaction': ["Reacted"], 'reel': ["Reacted to a reel"], 'attachment': ["sent a reel", "sent"]},
+    }
+    classifier = MessageClassifier(languages)
+    rng = random.Random(1)
+    texts, links = random_texts(rng, 5000, languages)
+    np.testing.assert_array_equal(classifier.classify(texts, links), expected(texts, links, languages))
@@ -0,0 +1,42 @@
+import random
+from collections import Counter
+
+import pandas as pd
+
+from insta_engine.emojis import EMOJI_PATTERN, count_emojis, emoji_table, extract_emojis
+
+
+def test_text_symbols_need_vs16():
+    assert extract_emojis("© 2024 Brand™ ⌘ ⬀ ↩") == []
+    assert extract_emojis("©️ ™️ ↩️") == ["©️", "™️", "↩️"]
+
+
+def test_graphemes():
+    text = (
+        "\U0001F468‍\U0001F469‍\U0001F467 \U0001F44D\U0001F3FD \U0001F1EE\U0001F1F3 1️⃣ #⃣ "
+        "\U0001F3F4\U000E0067\U000E0062\U000E0073\U000E0063\U000E0074\U000E007F ❤️❤️ ⭐"
+    )
+    assert count_emojis([text]) == Counter({
+        "\U0001F468‍\U0001F469‍\U0001F467": 1, "\U0001F44D\U0001F3FD": 1, "\U0001F1EE\U0001F1F3": 1,
+        "1️⃣": 1, "#⃣": 1, "\U0001F3F4\U000E0067\U000E0062\U000E0073\U000E0063\U000E0074\U000E007F": 1,
+        "❤️": 2, "⭐": 1,
+    })
+
+
+def test_count_matches_grapheme_pattern():
+    # count_emojis splits runs of emoji code points; it must agree with
+    # applying the grapheme pattern to the whole text
+    alphabet = list("ab 1#*") + [
+        "©", "™", "️", "‍", "⃣", "\U0001F602", "\U0001F44D", "\U0001F3FD",
+        "\U0001F1EE", "\U0001F1F3", "❤", "⭐", "⏸", "\U000E0067", "\U000E007F", "\U0001F3F4",
+    ]
+    rng = random.Random(0)
+    for _ in range(2000):
+        texts = ["".join(rng.choice(alphabet) for _ in range(rng.randint(0, 12))) for _ in range(5)]
+        assert count_emojis(texts) == Counter(EMOJI_PATTERN.findall("\n".join(texts)))
+
+
+def test_emoji_table():
+    df = pd.DataFrame({'name': ["a", "b", "a"], 'message': ["\U0001F602", "1⃣ \U0001F602", "\U0001F602\U0001F602"]})
+    table = emoji_table(df, 'name')
+    assert table.values.tolist() == [["a", "\U0001F602", 3], ["b", "1⃣", 1], ["b", "\U0001F602", 1]]
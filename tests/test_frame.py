@@ -0,0 +1,26 @@
+import numpy as np
+import pandas as pd
+
+from insta_engine import add_time_columns
+
+EDGES = [
+    "1969-12-31 23:59:59.999999", "1970-01-01 00:00:00", "1900-03-01 00:30:00", "1899-12-31 23:00:00",
+    "1600-02-29 12:00:00", "2000-02-29 23:59:59", "2024-02-29 00:00:00", "2024-03-01 00:00:00",
+    "2100-02-28 13:45:00",
+]
+
+
+def test_time_columns_match_pandas_accessors():
+    # Integer arithmetic against the datetime accessors, including times
+    # before 1970 (negative offsets) and leap days
+    rng = np.random.default_rng(0)
+    offsets = rng.integers(-200 * 365 * 86_400_000_000, 200 * 365 * 86_400_000_000, 5000)
+    times = np.concatenate([np.array(EDGES, dtype='datetime64[us]'), offsets.astype('datetime64[us]')])
+    df = add_time_columns(pd.DataFrame({'time': times}))
+    t = df['time'].dt
+    assert (df['date'].dt.date == t.date).all()
+    assert (df['day'] == t.day).all()
+    assert (df['hour'] == t.hour).all()
+    assert (df['weekday'].astype(str) == t.day_name().str.slice(0, 3)).all()
+    assert (df['month'] == (t.year - 1970) * 12 + t.month - 1).all()
+    assert (df['month_dt'] == t.to_period('M').dt.start_time).all()
@@ -0,0 +1,21 @@
+from collections import Counter
+
+from insta_engine import ChatStats, guess_owner
+
+
+def chat(**senders):
+    stats = ChatStats()
+    stats.senders = Counter(senders)
+    stats.total = sum(senders.values())
+    return stats
+
+
+def test_guess_owner():
+    assert guess_owner({'a': chat(Alice=1, Bob=2), 'b': chat(Alice=3, Chandra=1), 'c': ChatStats()}) == "Alice"
+
+
+def test_guess_owner_needs_a_single_candidate():
+    # Two people in every chat, or a single chat, tell nothing about the owner
+    assert guess_owner({'a': chat(Alice=1, Bob=2), 'b': chat(Alice=3, Bob=1)}) is None
+    assert guess_owner({'a': chat(Alice=1, Bob=2)}) is None
+    assert guess_owner({'a': chat(Alice=1), 'b': chat(Bob=1)}) is None
@@ -0,0 +1,18 @@
+import pickle
+
+from insta_engine import IncrementalAnalysis, MessageFilter
+
+
+def test_matches_settings():
+    analysis = IncrementalAnalysis(include_reels=True)
+    assert analysis.matches(True, None)
+    assert not analysis.matches(False, None)
+    assert not analysis.matches(True, MessageFilter.create(senders=["Bob"]))
+
+
+def test_states_from_older_versions_are_rebuilt():
+    # A state pickled before partials were versioned has no stats_version
+    analysis = IncrementalAnalysis()
+    del analysis.stats_version
+    restored = pickle.loads(pickle.dumps(analysis))
+    assert not restored.matches(False, None)
@@ -0,0 +1,70 @@
+import time
+
+import pytest
+
+from insta_engine.parsing import PARSER_ENGINES, TemplateMismatch, _collect, etree, iter_messages_fast, parse_html
+
+BLOCK = (
+    '<div class="pam _3-95 _2ph- _a6-g uiBoxWhite noborder">'
+    '<h2 class="_3-95 _2pim _a6-h _a6-i">{name}</h2>'
+    '<div class="_3-95 _a6-p">{body}</div>'
+    '<div class="_3-94 _a6-o">{time}</div></div>\n'
+)
+
+
+def text_body(text):
+    return f'<div><div></div><div>{text}</div><div></div><div></div></div>'
+
+
+BODIES = [
+    text_body("plain text"),
+    text_body("Tom &amp; Jerry &lt;3 &quot;quoted&quot; &#039;single&#039; &#128514;"),
+    text_body('<a target="_blank" href="https://www.instagram.com/reel/C123/">https://www.instagram.com/reel/C123/</a>'),
+    text_body('look <a target="_blank" href="https://example.com/?a=1&amp;b=2">https://example.com/?a=1&amp;b=2</a>'),
+    text_body("line one<br />line two<br>line three"),
+    '<div><div></div><div></div><div><img src="messages/inbox/x/photos/1.jpg" class="_a6_o _3-96" /></div>'
+    '<div></div></div>',
+    text_body("nice") + '<div><ul class="_a6-q"><li><span>❤️Bob</span></li><li><span>\U0001F602Alice</span></li></ul></div>',
+    text_body("Reacted ❤️ to your message"),
+    text_body("Bob shared a reel."),
+    text_body("  spaced   out  "),
+    text_body(""),
+]
+
+
+def export(bodies, names=("Alice", "O&#039;Brien &amp; co")):
+    blocks = "".join(
+        BLOCK.format(name=names[i % len(names)], body=body, time=f"Jan {i % 28 + 1:02d}, 2024 {i % 12 + 1}:05 pm")
+        for i, body in enumerate(bodies)
+    )
+    return f'<html><head><meta charset="utf-8" /></head><body><div role="main">\n{blocks}</div></body></html>'
+
+
+def rows(engine, source):
+    return _collect(PARSER_ENGINES[engine](source)).to_frame()
+
+
+@pytest.mark.parametrize("engine", ["lxml", "soup"])
+def test_fast_path_matches_full_parsers(engine):
+    if engine == "lxml" and etree is None:
+        pytest.skip("lxml is not installed")
+    source = export(BODIES).encode()
+    fast = rows("fast", source)
+    assert len(fast) == len(BODIES)
+    assert fast.equals(rows(engine, source))
+
+
+def test_template_mismatch_fails_fast():
+    # An extra attribute on every timestamp div: the fast path must give up
+    # in linear time rather than scan to the end of the file for every block,
+    # and the full parsers still read the file
+    source = export([text_body(f"message {i}") for i in range(8000)]).replace(
+        'class="_3-94 _a6-o"', 'class="_3-94 _a6-o" dir="auto"'
+    ).encode()
+    start = time.perf_counter()
+    with pytest.raises(TemplateMismatch):
+        list(iter_messages_fast(source))
+    assert time.perf_counter() - start < 2
+
+    parsed = parse_html(source).to_frame()
+    assert len(parsed) == 8000
@@ -0,0 +1,14 @@
+from insta_engine import collect, stage
+
+
+def test_nested_stages_keep_the_outer_peak():
+    with collect(trace_memory=True) as profiler:
+        with stage("outer"):
+            block = bytearray(64 * 2**20)
+            del block
+            with stage("inner"):
+                pass
+    memory = {record.name: record.memory_mb for record in profiler.stages}
+    assert memory["outer"] >= 64
+    assert memory["inner"] < 64
+    assert not profiler.open_stages
@@ -0,0 +1,123 @@
+import copy
+import random
+from dataclasses import fields
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+from insta_engine import (
+    WEEKDAYS, ChatStats, MessageColumns, build_frame, calendar_heatmap, classify_messages, prepare_frame, weekly_heatmap
+)
+
+TEXTS = ["hi", "ok \U0001F602\U0001F602", "\U0001F44D\U0001F3FD", "see you", "Reacted ❤️ to your message", "1️⃣ \U0001F1EE\U0001F1F3"]
+
+
+def chat_frame(n, seed=0):
+    rng = random.Random(seed)
+    start = datetime(2022, 12, 20)
+    names = [rng.choice(["Alice", "Bob", "Chandra"]) for _ in range(n)]
+    texts = [rng.choice(TEXTS) for _ in range(n)]
+    times = [f"{start + timedelta(minutes=rng.randint(0, 60 * 24 * 500)):%Y-%m-%d %H:%M:%S}" for _ in range(n)]
+    columns = MessageColumns.from_lists(names, texts, classify_messages(texts, [None] * n), times)
+    return prepare_frame(build_frame(columns))
+
+
+def assert_same_dashboard(a, b):
+    a, b = a.dashboard(), b.dashboard()
+    assert a.total == b.total
+    for field in fields(a):
+        if field.name != 'total':
+            pd.testing.assert_frame_equal(getattr(a, field.name), getattr(b, field.name), check_dtype=False)
+
+
+def test_file_split_matches_whole_chat():
+    df = chat_frame(3000)
+    whole = ChatStats.from_frame(df)
+    # Per-file partials, including an empty file
+    bounds = [0, 700, 700, 1900, 3000]
+    partials = [ChatStats.from_frame(df.iloc[lo:hi]) for lo, hi in zip(bounds, bounds[1:])]
+    assert_same_dashboard(ChatStats.reduce(partials), whole)
+    assert_same_dashboard(ChatStats.reduce(reversed(partials)), whole)
+
+
+def test_merge_is_a_monoid():
+    df = chat_frame(900, seed=1)
+    a, b, c = (ChatStats.from_frame(df.iloc[i::3]) for i in range(3))
+    before = [copy.deepcopy(vars(s)) for s in (a, b, c)]
+
+    assert_same_dashboard((a + b) + c, a + (b + c))
+    assert_same_dashboard(ChatStats() + a, a)
+    assert_same_dashboard(a + ChatStats(), a)
+
+    # Partials handed to merge() and reduce() are never mutated
+    ChatStats.reduce([a, b, c])
+    for stats, state in zip((a, b, c), before):
+        after = vars(stats)
+        assert after.keys() == state.keys()
+        for key, value in state.items():
+            if hasattr(value, 'tolist'):
+                assert value.tolist() == after[key].tolist()
+            else:
+                assert value == after[key]
+
+
+def legacy_weekly_heatmap(weekly):
+    # The resample/cumcount/pivot version weekly_heatmap replaced
+    weekly_data = weekly.rename(columns={'week': 'time'})
+    weekly_data['month_date'] = weekly_data['time'].dt.to_period('M').apply(lambda r: r.start_time)
+    weekly_data['week_rank'] = weekly_data.groupby('month_date').cumcount() + 1
+    weekly_data.loc[weekly_data['week_rank'] > 4, 'week_rank'] = 4
+    weekly_data = weekly_data.groupby(['month_date', 'week_rank'])['count'].sum().reset_index()
+
+    last_year = weekly_data['month_date'].max() - pd.DateOffset(months=11)
+    weekly_data = weekly_data[weekly_data['month_date'] >= last_year]
+
+    heatmap_pivot = weekly_data.pivot(index='week_rank', columns='month_date', values='count').fillna(0)
+    return heatmap_pivot.reindex(range(1, 5), fill_value=0)
+
+
+def test_weekly_heatmap_matches_legacy():
+    rng = np.random.default_rng(0)
+    for _ in range(50):
+        # Contiguous weeks ending on Mondays, from a few weeks to several years
+        start = pd.Timestamp("2019-01-07") + pd.Timedelta(weeks=int(rng.integers(0, 200)))
+        weeks = int(rng.integers(1, 300))
+        weekly = pd.DataFrame({
+            'week': pd.date_range(start, periods=weeks, freq='7D').as_unit('us'),
+            'count': rng.integers(0, 50, weeks),
+        })
+        pd.testing.assert_frame_equal(
+            weekly_heatmap(weekly), legacy_weekly_heatmap(weekly).astype(np.int64), check_names=False
+        )
+    # and the weeks of a real dashboard
+    weekly = ChatStats.from_frame(chat_frame(3000)).dashboard().weekly
+    pd.testing.assert_frame_equal(
+        weekly_heatmap(weekly), legacy_weekly_heatmap(weekly).astype(np.int64), check_names=False
+    )
+
+
+def test_calendar_heatmap_alignment():
+    stats = ChatStats.from_frame(chat_frame(3000))
+    grid = calendar_heatmap(stats.days, weeks=20)
+    assert grid.shape == (7, 20)
+    assert list(grid.index) == list(WEEKDAYS)
+    assert (grid.columns.dayofweek == 0).all()
+    assert (np.diff(grid.columns.to_numpy()) == np.timedelta64(7, 'D')).all()
+
+    last_day = max(stats.days)
+    last = pd.Timestamp(np.datetime64(last_day, 'D'))
+    assert grid.columns[-1] <= last < grid.columns[-1] + pd.Timedelta(days=7)
+    row = last.dayofweek
+    assert grid.iloc[row, -1] == stats.days[last_day]
+    # Only the days after the last one are blank
+    assert grid.iloc[row + 1:, -1].isna().all()
+    assert grid.iloc[:row + 1, :].notna().all().all() and grid.iloc[:, :-1].notna().all().all()
+
+    # Every cell holds its own day's count
+    first_day = (grid.columns[0] - pd.Timestamp(0)).days
+    for day, count in stats.days.items():
+        if day >= first_day:
+            week, weekday = divmod(day - first_day, 7)
+            assert grid.iloc[weekday, week] == count
+    assert grid.sum().sum() == sum(count for day, count in stats.days.items() if day >= first_day)